@@ -0,0 +1,4 @@
+# Loaded once for every entry point (the API, and the `python -m app.core.*` maintenance CLIs)
+from dotenv import load_dotenv
+
+load_dotenv()
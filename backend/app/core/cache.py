@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+from app.core import metrics
+
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", "2048"))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", "86400")) # seconds
+# Shared tier so identical posts hit across workers/instances. Off by default.
+GENERATION_CACHE_MONGO = os.getenv("GENERATION_CACHE_MONGO", "").lower() in ("1", "true", "yes")
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_job_description(job_description: str) -> str:
+    """Collapses whitespace and case so re-pastes of the same post map to the same key."""
+    return _WHITESPACE.sub(" ", job_description).strip().lower()
+
+def make_generation_key(job_description: str, user_profile: dict, framework: str, cta_style: str, tone_level: int) -> str:
+    payload = {
+        "job": normalize_job_description(job_description),
+        "profile": {
+            "skill": user_profile.get("skill"),
+            "niche": user_profile.get("niche"),
+            "experience": user_profile.get("experience"),
+        },
+        "framework": framework,
+        "cta_style": cta_style,
+        "tone_level": tone_level,
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class MemoryCache:
+    """In-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str):
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+class MongoCache:
+    """Shared tier in the `generation_cache` collection. Expiry is handled by a TTL index on `expires_at`."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    @property
+    def collection(self):
+        from app.core.db import db
+        return db.generation_cache
+
+    async def get(self, key: str) -> Optional[str]:
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        return doc["text"] if doc else None
+
+    async def set(self, key: str, value: str):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"text": value, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}},
+            upsert=True
+        )
+
+class GenerationCache:
+    """
+    Two-tier cache for generated proposals: the local LRU is checked first, then the
+    optional shared tier. Shared hits are copied into the local tier.
+    """
+
+    def __init__(self, local: MemoryCache, shared: Optional[MongoCache] = None):
+        self.local = local
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            try:
+                value = await self.shared.get(key)
+            except Exception:
+                # The shared tier is best effort; a Mongo hiccup just means a miss
+                value = None
+            if value is not None:
+                self.hits += 1
+                self.shared_hits += 1
+                await self.local.set(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        await self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, value)
+            except Exception:
+                pass
+
+generation_cache = GenerationCache(
+    MemoryCache(GENERATION_CACHE_SIZE, GENERATION_CACHE_TTL),
+    MongoCache(GENERATION_CACHE_TTL) if GENERATION_CACHE_MONGO else None
+)
+
+metrics.Collected(
+    "generation_cache_lookups_total", "Generation cache lookups by result (bypass: caching skipped for the request).",
+    lambda: {
+        ("local_hit",): generation_cache.hits - generation_cache.shared_hits,
+        ("shared_hit",): generation_cache.shared_hits,
+        ("miss",): generation_cache.misses,
+        ("bypass",): generation_cache.bypasses,
+    },
+    ("result",), kind="counter"
+)
+metrics.Collected("generation_cache_entries", "Entries in this worker's local cache tier.", lambda: {(): len(generation_cache.local)})
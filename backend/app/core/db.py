@@ -1,12 +1,72 @@
-from pymongo import MongoClient
 import os
-from dotenv import load_dotenv
-import certifi
-
-load_dotenv()
 
 MONGO_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGODB_DB", "replyboost")
+
+# Pool sizing per worker process. Defaults match pymongo's except for a small warm minimum.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "10000"))
+
+# Passing tlsCAFile turns TLS on, which a plain local mongod rejects. MONGO_TLS=auto (default)
+# enables it for mongodb+srv:// (Atlas) and for URLs that ask for tls/ssl; true/false force it.
+MONGO_TLS = os.getenv("MONGO_TLS", "auto").lower()
+
+def _use_tls(url: str) -> bool:
+    if MONGO_TLS in ("1", "true", "yes"):
+        return True
+    if MONGO_TLS in ("0", "false", "no"):
+        return False
+    lowered = url.lower()
+    return lowered.startswith("mongodb+srv://") or "tls=true" in lowered or "ssl=true" in lowered
+
+_client = None
+_database = None
+
+def get_client():
+    """The shared client, built on first use (connect() from the app lifespan, or the first query)."""
+    global _client
+    if _client is None:
+        import certifi
+        from pymongo import AsyncMongoClient
+        from app.core.metrics import MongoCommandMetrics
+
+        # Use certifi to provide robust SSL certificate handling for Render/Cloud
+        tls = {"tlsCAFile": certifi.where()} if _use_tls(MONGO_URL) else {}
+        _client = AsyncMongoClient(
+            MONGO_URL,
+            **tls,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+            event_listeners=[MongoCommandMetrics()]
+        )
+    return _client
+
+def get_database():
+    global _database
+    if _database is None:
+        _database = get_client()[MONGO_DB]
+    return _database
+
+class _LazyDatabase:
+    """Stands in for client[MONGO_DB] so modules can keep `from app.core.db import db`."""
+
+    def __getattr__(self, name):
+        return getattr(get_database(), name)
+
+    def __getitem__(self, name):
+        return get_database()[name]
+
+db = _LazyDatabase()
+
+async def connect():
+    await get_client().aconnect()
 
-# Use certifi to provide robust SSL certificate handling for Render/Cloud
-client = MongoClient(MONGO_URL, tlsCAFile=certifi.where())
-db = client.replyboost
+async def close():
+    global _client, _database
+    if _client is not None:
+        await _client.close()
+        _client = _database = None
@@ -0,0 +1,67 @@
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+from typing import List
+import orjson
+from fastapi.responses import StreamingResponse
+
+# Streaming history exports (NDJSON or CSV, optionally gzipped) straight from a Mongo cursor.
+# Rows are encoded a batch at a time, so memory stays flat whatever the history size.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _encode_ndjson(rows: List[dict], fields: List[str]) -> bytes:
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+def _encode_csv(rows: List[dict], fields: List[str]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    for row in rows:
+        writer.writerow({k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in row.items()})
+    return buffer.getvalue().encode("utf-8")
+
+async def _chunks(cursor, fmt: str, fields: List[str], compress: bool):
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    # wbits=31: gzip container. SYNC_FLUSH after each batch so bytes keep flowing to the client.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(data: bytes) -> bytes:
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    if fmt == "csv":
+        yield emit((",".join(fields) + "\r\n").encode("utf-8"))
+
+    rows = []
+    # The first row goes out on its own so the download starts right away
+    flush_at = 1
+    try:
+        async for row in cursor:
+            rows.append(row)
+            if len(rows) >= flush_at:
+                yield emit(encode(rows, fields))
+                rows = []
+                flush_at = EXPORT_BATCH_SIZE
+        if rows:
+            yield emit(encode(rows, fields))
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        # Client went away mid-download: release the server-side cursor now
+        await cursor.close()
+
+def export_response(cursor, name: str, fmt: str, fields: List[str], compress: bool) -> StreamingResponse:
+    """
+    `cursor` must already be projected to the export shape (plain JSON types and datetimes).
+    `fields` is the CSV column order.
+    """
+    filename = f"{name}-{datetime.utcnow():%Y%m%d}.{fmt}" + (".gz" if compress else "")
+    return StreamingResponse(
+        _chunks(cursor.batch_size(EXPORT_BATCH_SIZE), fmt, fields, compress),
+        media_type="application/gzip" if compress else FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
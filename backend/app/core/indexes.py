@@ -0,0 +1,125 @@
+"""
+Index declarations for every collection, applied from the app lifespan.
+
+    python -m app.core.indexes            # create/ensure indexes
+    python -m app.core.indexes --verify   # ensure, then explain() every hot query and fail on a COLLSCAN
+"""
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "proposals": [
+        # List view (keyset on created_at, _id), analytics date range, exports
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_created"),
+        # Search. The user_id prefix partitions the index, so every $text query must pin user_id.
+        # People search by the job they applied to, so the post counts double.
+        IndexModel(
+            [("user_id", ASCENDING), ("full_job_description", TEXT), ("proposal_text", TEXT)],
+            weights={"full_job_description": 2, "proposal_text": 1},
+            name="user_text"
+        ),
+    ],
+    "income": [
+        IndexModel([("user_id", ASCENDING), ("date", DESCENDING)], name="user_date"),
+    ],
+    "income_monthly": [
+        IndexModel([("user_id", ASCENDING), ("month", ASCENDING)], unique=True, name="user_month"),
+    ],
+    "generation_cache": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+}
+
+# The queries the routers run on (nearly) every request, as explain-able commands. Keep these in
+# step with the routers: a query changed there without changing it here is no longer verified.
+# A sample user id is enough: the planner picks the same plan whatever the value.
+_USER = ObjectId()
+_NOW = datetime(2024, 1, 1)
+_PAGE_SORT = {"created_at": -1, "_id": -1}
+# GET /proposals past the first page: keyset on (created_at, _id) plus every optional filter
+_NEXT_PAGE = [{"created_at": {"$lt": _NOW}}, {"created_at": _NOW, "_id": {"$lt": _USER}}]
+HOT_QUERIES = [
+    ("auth/users: user by email", {"find": "users", "filter": {"email": "someone@example.com"}}),
+    ("users: current user by id", {"find": "users", "filter": {"_id": _USER}}),
+    ("proposals: list", {"find": "proposals", "filter": {"user_id": _USER}, "sort": _PAGE_SORT, "limit": 51}),
+    ("proposals: list by status", {"find": "proposals", "filter": {"user_id": _USER, "status": "replied"}, "sort": _PAGE_SORT, "limit": 51}),
+    ("proposals: list, next page", {"find": "proposals", "filter": {"user_id": _USER, "$or": _NEXT_PAGE}, "sort": _PAGE_SORT, "limit": 51}),
+    ("proposals: list, next page, filtered", {
+        "find": "proposals",
+        "filter": {"user_id": _USER, "status": "replied", "platform": "Upwork", "framework": "Fast Hook", "$or": _NEXT_PAGE},
+        "sort": _PAGE_SORT, "limit": 51
+    }),
+    ("proposals: search", {
+        "find": "proposals",
+        "filter": {"user_id": _USER, "$text": {"$search": "shopify migration"}},
+        "projection": {"relevance": {"$meta": "textScore"}},
+        "sort": {"relevance": {"$meta": "textScore"}, "created_at": -1}, "limit": 21
+    }),
+    ("proposals: detail / status update", {"find": "proposals", "filter": {"_id": _USER, "user_id": _USER}}),
+    ("proposals: export", {"find": "proposals", "filter": {"user_id": _USER}, "sort": {"created_at": 1, "_id": 1}}),
+    ("proposals: export, date range", {
+        "find": "proposals", "filter": {"user_id": _USER, "created_at": {"$gte": _NOW, "$lt": _NOW}}, "sort": {"created_at": 1, "_id": 1}
+    }),
+    ("proposal_stats: rollup", {"find": "proposal_stats", "filter": {"_id": _USER}}),
+    ("income: export", {"find": "income", "filter": {"user_id": _USER}, "sort": {"date": 1, "_id": 1}}),
+    ("income: list", {"find": "income", "filter": {"user_id": _USER}, "sort": {"date": -1, "_id": -1}}),
+    ("income: list, filtered", {
+        "find": "income", "filter": {"user_id": _USER, "date": {"$gte": _NOW, "$lt": _NOW}, "platform": "Upwork", "client": "Acme"},
+        "sort": {"date": -1, "_id": -1}
+    }),
+    ("income: summary", {"find": "income_monthly", "filter": {"user_id": _USER, "count": {"$gt": 0}}, "sort": {"month": 1}}),
+]
+
+async def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate emails already stored; keep serving, but make it visible
+            logger.warning("Could not ensure indexes on %s: %s", collection, e)
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+async def verify_hot_queries(db) -> list:
+    """Returns (name, stages) for every hot query whose winning plan contains a COLLSCAN."""
+    failures = []
+    for name, command in HOT_QUERIES:
+        explained = await db.command("explain", command, verbosity="queryPlanner")
+        stages = list(_stages(explained["queryPlanner"]["winningPlan"]))
+        if "COLLSCAN" in stages:
+            failures.append((name, stages))
+    return failures
+
+async def _main(verify: bool) -> int:
+    from app.core.db import db, close
+    try:
+        await ensure_indexes(db)
+        print("Indexes ensured.")
+        if not verify:
+            return 0
+        failures = await verify_hot_queries(db)
+        for name, stages in failures:
+            print(f"COLLSCAN: {name} -> {' <- '.join(s for s in stages if s)}")
+        print(f"{len(HOT_QUERIES) - len(failures)}/{len(HOT_QUERIES)} hot queries use an index.")
+        return 1 if failures else 0
+    finally:
+        await close()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main("--verify" in sys.argv[1:])))
@@ -0,0 +1,94 @@
+"""
+Income ledger storage. Entries keep `date` as a real datetime (midnight UTC), a `month`
+bucket ("YYYY-MM") and `amount` as Decimal128 so totals don't drift. Per-user monthly
+totals live in `income_monthly` and are adjusted on every add/edit/delete.
+
+    python -m app.core.ledger     # one-shot migration of string dates / float amounts, then rebuild monthly totals
+"""
+import asyncio
+import sys
+from datetime import date, datetime, time
+from decimal import Decimal, ROUND_HALF_UP
+from bson import Decimal128
+from app.core.db import db
+
+CENTS = Decimal("0.01")
+
+def to_decimal128(amount) -> Decimal128:
+    return Decimal128(Decimal(str(amount)).quantize(CENTS, rounding=ROUND_HALF_UP))
+
+def to_datetime(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+def month_of(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+# API shape, computed by the server: same fields the frontend always got (string id, float
+# amount, YYYY-MM-DD date). Legacy entries with string dates pass through truncated to the day.
+API_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "amount": {"$toDouble": "$amount"},
+    "client": 1,
+    "platform": 1,
+    "date": {"$cond": [
+        {"$eq": [{"$type": "$date"}, "date"]},
+        {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+        {"$substrCP": [{"$toString": "$date"}, 0, 10]},
+    ]},
+}
+
+async def adjust_month(user_id, month: str, amount: Decimal128, count: int):
+    """Adds `amount` (negative to subtract) and `count` entries to a user's monthly total."""
+    await db.income_monthly.update_one(
+        {"user_id": user_id, "month": month},
+        {"$inc": {"total": amount, "count": count}},
+        upsert=True
+    )
+
+def negate(amount: Decimal128) -> Decimal128:
+    return Decimal128(-amount.to_decimal())
+
+async def rebuild_monthly(user_id=None) -> int:
+    """Recomputes income_monthly from the ledger (all users, or one)."""
+    match = {"user_id": user_id} if user_id is not None else {}
+    groups = await (await db.income.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "month": "$month"},
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+        }},
+    ])).to_list()
+    await db.income_monthly.delete_many(match)
+    if groups:
+        await db.income_monthly.insert_many([
+            {"user_id": g["_id"]["user_id"], "month": g["_id"]["month"], "total": g["total"], "count": g["count"]}
+            for g in groups
+        ])
+    return len(groups)
+
+async def migrate() -> int:
+    """Converts legacy entries (string date, float amount, no month). Safe to run more than once."""
+    migrated = 0
+    async for entry in db.income.find({"$or": [{"date": {"$type": "string"}}, {"month": {"$exists": False}}]}):
+        day = entry["date"] if isinstance(entry["date"], datetime) else datetime.strptime(entry["date"][:10], "%Y-%m-%d")
+        await db.income.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"date": day, "month": month_of(day), "amount": to_decimal128(entry.get("amount", 0))}}
+        )
+        migrated += 1
+    await rebuild_monthly()
+    return migrated
+
+async def _main() -> int:
+    from app.core.db import close
+    try:
+        migrated = await migrate()
+        print(f"Migrated {migrated} income entries and rebuilt monthly totals.")
+        return 0
+    finally:
+        await close()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -1,175 +1,198 @@
-import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Use Groq or OpenAI. Default to checking GROQ_API_KEY first.
-API_KEY = os.getenv("GROQ_API_KEY") or os.getenv("OPENAI_API_KEY")
-BASE_URL = "https://api.groq.com/openai/v1" if os.getenv("GROQ_API_KEY") else None
-
-client = OpenAI(api_key=API_KEY, base_url=BASE_URL) if API_KEY else None
-
-FRAMEWORK_PROMPTS = {
-    "Fast Hook": """
-    STRATEGY: FAST HOOK
-    - Goal: Grab attention in the first 3 seconds.
-    - Structure:
-      1. HOOK: One short, punchy sentence addressing their biggest pain point.
-      2. SOLUTION: Briefly state you can fix it.
-      3. CTA: Ask a simple "Yes/No" or "When" question.
-    - Omit: Background, extensive portfolio, generic greetings.
-    """,
-    "Proof-Driven": """
-    STRATEGY: PROOF-DRIVEN
-    - Goal: Build trust immediately through past wins.
-    - Structure:
-      1. RELEVANCE: Mention a similar project you solved.
-      2. OUTCOME: State the specific result (metrics if possible) of that past project.
-      3. TIE-IN: Explain how this applies to *their* job.
-      4. CTA: Ask to share that specific case study.
-    """,
-    "Problem-Solution": """
-    STRATEGY: PROBLEM-SOLUTION
-    - Goal: Show you understand the complexity.
-    - Structure:
-      1. DIAGNOSIS: Restate their problem in technical terms to show understanding.
-      2. PLAN: Bullet points (max 3) of your technical approach.
-      3. CTA: Ask a technical question about their stack/requirements.
-    """,
-    "Authority": """
-    STRATEGY: AUTHORITY
-    - Goal: Dominate the frame. You are the expert selection them.
-    - Structure:
-      1. ASSERTION: State clearly that you are the right fit.
-      2. QUALIFICATION: Minimal brag (e.g. "I've done this for X years").
-      3. NEXT STEP: Tell them to book a call if they are serious.
+import asyncio
+import hashlib
+from app.core import metrics
+from app.core.providers import router as llm_router
+from app.core.cache import generation_cache, make_generation_key
+from app.core.scoring import score_reply
+from app.core.signals import detect_signals
+from app.core.prompts import FRAMEWORK_PROMPTS, build_proposal_messages
+
+# Provider selection, failover, hedging and the pooled HTTP client live in providers.py
+
+async def close_client():
+    await llm_router.close()
+
+# --- Single-flight -------------------------------------------------------------
+# Identical requests (same messages + model parameters) that overlap in time share one
+# upstream call: a double-clicked Generate or two retrying tabs cost one completion.
+
+coalescing_stats = {"completions": 0, "coalesced_completions": 0, "streams": 0, "coalesced_streams": 0}
+
+_inflight_completions = {}
+_inflight_streams = {}
+
+metrics.Collected(
+    "llm_coalesce_requests_total", "LLM requests by kind, and whether they joined an identical in-flight call.",
+    lambda: {
+        ("completion", "upstream"): coalescing_stats["completions"],
+        ("completion", "coalesced"): coalescing_stats["coalesced_completions"],
+        ("stream", "upstream"): coalescing_stats["streams"],
+        ("stream", "coalesced"): coalescing_stats["coalesced_streams"],
+    },
+    ("kind", "outcome"), kind="counter"
+)
+
+def _request_key(params: dict) -> str:
+    raw = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+async def _create_completion(params: dict, framework: str) -> str:
+    return await llm_router.complete(params, framework=framework)
+
+async def _complete(framework: str = "", **params) -> str:
+    """
+    Routed completion for the first caller; concurrent identical callers await the same result.
+    `framework` labels the LLM metrics and is not part of the request.
     """
-}
+    key = _request_key(params)
+    task = _inflight_completions.get(key)
+    if task is None:
+        coalescing_stats["completions"] += 1
+        task = asyncio.ensure_future(_create_completion(params, framework))
+        _inflight_completions[key] = task
+        task.add_done_callback(lambda _: _inflight_completions.pop(key, None))
+    else:
+        coalescing_stats["coalesced_completions"] += 1
+    # shield: one caller disconnecting must not cancel the call for the others
+    return await asyncio.shield(task)
+
+class _SharedStream:
+    """One upstream stream fanned out to every subscriber; late joiners get the chunks so far replayed."""
+
+    def __init__(self):
+        self.chunks = []
+        self.error = None
+        self.done = False
+        self._changed = asyncio.Condition()
+
+    async def produce(self, params: dict, framework: str):
+        try:
+            async for delta in llm_router.stream(params, framework=framework):
+                async with self._changed:
+                    self.chunks.append(delta)
+                    self._changed.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            async with self._changed:
+                self.done = True
+                self._changed.notify_all()
+
+    async def subscribe(self):
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: sent < len(self.chunks) or self.done)
+                new = self.chunks[sent:]
+            for delta in new:
+                yield delta
+            sent += len(new)
+            if self.done and sent == len(self.chunks):
+                break
+        if self.error is not None:
+            raise self.error
+
+def _stream(framework: str = "", **params):
+    """Streaming counterpart of _complete. Returns an async iterator of text deltas."""
+    key = _request_key(params)
+    flight = _inflight_streams.get(key)
+    if flight is None:
+        coalescing_stats["streams"] += 1
+        flight = _SharedStream()
+        _inflight_streams[key] = flight
+        task = asyncio.ensure_future(flight.produce(params, framework))
+        task.add_done_callback(lambda _: _inflight_streams.pop(key, None))
+    else:
+        coalescing_stats["coalesced_streams"] += 1
+    return flight.subscribe()
+
+def _framework_label(framework: str) -> str:
+    # Metric label: frameworks come from the request body, so unknown values collapse into one series
+    return framework if framework in FRAMEWORK_PROMPTS else "other"
 
 def analyze_job_signals(job_description: str) -> list:
-    """Detects key signals in the job description for UI badges."""
-    signals = []
-    text = job_description.lower()
-    
-    if any(w in text for w in ["urgent", "asap", "immediately", "deadline"]):
-        signals.append({"label": "Urgent", "code": "urgent", "color": "red"})
-    
-    if any(w in text for w in ["budget", "price", "fixed", "rate", "$"]):
-        signals.append({"label": "Budget Mentioned", "code": "budget", "color": "green"})
-        
-    if any(w in text for w in ["long term", "ongoing", "contract", "full time"]):
-        signals.append({"label": "Long Term", "code": "long_term", "color": "blue"})
-        
-    if any(w in text for w in ["expert", "senior", "advanced", "experience"]):
-        signals.append({"label": "High Intent", "code": "high_intent", "color": "purple"})
-        
-    return signals
+    """Detects key signals in the job description for UI badges. Rules live in app/core/signals.py."""
+    return detect_signals(job_description)
 
 def calculate_reply_strength(reply: str, job_description: str) -> dict:
     """
     Analyzes the reply against the job description to provide a strength score.
     Uses simple heuristics for speed and cost-efficiency (could be LLM-based in future).
+    See app/core/scoring.py; use score_replies there to score many replies at once.
     """
-    score = 50 # Base score
-    breakdown = []
-    
-    # 1. Length Check (Optimal: 50-150 words)
-    word_count = len(reply.split())
-    if 50 <= word_count <= 150:
-        score += 10
-        breakdown.append("Perfect Length")
-    elif word_count < 50:
-        breakdown.append("Too Short")
-    else:
-        score -= 5
-        breakdown.append("Too Long")
-        
-    # 2. Key Terms (Relevance)
-    job_words = set(job_description.lower().split())
-    # Filter common stop words would be better, but simple check for now
-    keywords = [w for w in job_words if len(w) > 5] 
-    reply_lower = reply.lower()
-    matches = sum(1 for w in keywords if w in reply_lower)
-    
-    if matches > 2:
-        score += 15
-        breakdown.append("Good Keyword Usage")
-    elif matches > 0:
-        score += 5
-    else:
-        breakdown.append("Missed Keywords")
-        
-    # 3. Question/CTA Check
-    if "?" in reply:
-        score += 15
-        breakdown.append("Clear CTA")
-    else:
-        score -= 10
-        breakdown.append("Missing Question")
-        
-    # 4. formatting
-    if "\n" in reply: # Paragraphs used
-        score += 10
-        
-    return {
-        "score": min(100, max(0, score)),
-        "breakdown": breakdown,
-        "label": "Strong" if score > 80 else "Average" if score > 60 else "Weak"
-    }
-
-def generate_proposal(job_description: str, user_profile: dict, framework: str = "Fast Hook", cta_style: str = "Confident", tone_level: int = 50) -> str:
-    if not client:
+    return score_reply(reply, job_description)
+
+async def generate_proposal(job_description: str, user_profile: dict, framework: str = "Fast Hook", cta_style: str = "Confident", tone_level: int = 50, regenerate: bool = False) -> str:
+    """
+    Results are cached on (normalized job, profile, params). Pass regenerate=True to skip the
+    cache lookup; the fresh result still replaces the cached one.
+    """
+    if not llm_router.providers:
         return "Error: AI API Key not configured."
     
-    # Determine Tone prompt
-    tone_instruction = "Balanced professional tone."
-    if tone_level < 30:
-        tone_instruction = "Very friendly, warm, and enthusiastic tone."
-    elif tone_level > 70:
-        tone_instruction = "Very direct, concise, and no-nonsense tone."
-        
-    framework_instruction = FRAMEWORK_PROMPTS.get(framework, FRAMEWORK_PROMPTS["Fast Hook"])
-    
-    system_prompt = f"""
-    You are an expert freelancer. Write a proposal based on the following framework.
-    
-    {framework_instruction}
+    cache_key = make_generation_key(job_description, user_profile, framework, cta_style, tone_level)
+    if regenerate:
+        generation_cache.bypasses += 1
+    else:
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            return cached
     
-    ADDITIONAL RULES:
-    - Tone: {tone_instruction}
-    - CTA Style: {cta_style} (e.g. Soft = "chat?", Confident = "ready?", Action = "see demo").
-    - MAX 150 Words.
-    - NO placeholders.
-    """
-
-    user_prompt = f"""
-    MY PROFILE:
-    Skill: {user_profile.get('skill', 'General')}
-    Niche: {user_profile.get('niche', 'General')}
-    Experience: {user_profile.get('experience', 'Mid')}
-    
-    JOB DESCRIPTION:
-    {job_description}
-    """
+    messages, _ = build_proposal_messages(job_description, user_profile, framework, cta_style, tone_level)
 
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile" if os.getenv("GROQ_API_KEY") else "gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+        text = await _complete(
+            framework=_framework_label(framework),
+            messages=messages,
             temperature=0.7,
             max_tokens=350
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         return f"Error: {str(e)}"
 
-def refine_proposal(existing_proposal: str, instruction: str) -> str:
-    if not client:
+    await generation_cache.set(cache_key, text)
+    return text
+
+async def stream_proposal(job_description: str, user_profile: dict, framework: str = "Fast Hook", cta_style: str = "Confident", tone_level: int = 50, regenerate: bool = False):
+    """
+    Same prompt as generate_proposal, but yields text deltas as the provider sends them.
+    Errors are yielded as a single "Error: ..." chunk so callers keep the non-streaming semantics.
+    A cache hit is yielded as one chunk.
+    """
+    if not llm_router.providers:
+        yield "Error: AI API Key not configured."
+        return
+    
+    cache_key = make_generation_key(job_description, user_profile, framework, cta_style, tone_level)
+    if regenerate:
+        generation_cache.bypasses += 1
+    else:
+        cached = await generation_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    messages, _ = build_proposal_messages(job_description, user_profile, framework, cta_style, tone_level)
+
+    try:
+        chunks = []
+        async for delta in _stream(
+            framework=_framework_label(framework),
+            messages=messages,
+            temperature=0.7,
+            max_tokens=350
+        ):
+            chunks.append(delta)
+            yield delta
+    except Exception as e:
+        yield f"Error: {str(e)}"
+        return
+
+    await generation_cache.set(cache_key, "".join(chunks).strip())
+
+async def refine_proposal(existing_proposal: str, instruction: str) -> str:
+    if not llm_router.providers:
         return existing_proposal
         
     system_prompt = f"""
@@ -179,8 +202,8 @@ def refine_proposal(existing_proposal: str, instruction: str) -> str:
     """
     
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile" if os.getenv("GROQ_API_KEY") else "gpt-3.5-turbo",
+        return await _complete(
+            framework="refine",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": existing_proposal}
@@ -188,6 +211,5 @@ def refine_proposal(existing_proposal: str, instruction: str) -> str:
             temperature=0.7,
             max_tokens=350
         )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
+    except Exception:
         return existing_proposal
@@ -0,0 +1,202 @@
+import time
+from typing import Dict, Optional, Tuple
+from pymongo import monitoring
+
+# In-process metrics rendered in the Prometheus text format at GET /metrics.
+# Counters and histograms are plain dicts keyed by label values; everything runs on the event
+# loop thread so no locking is needed. Values are per worker process: scrape each worker
+# (or run one worker per container) and let Prometheus aggregate.
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_registry = []
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: Dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: tuple = HTTP_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (non-cumulative, last one is +Inf), sum, count]
+        self.values: Dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Collected:
+    """
+    Values read at scrape time from state another module already keeps (queue depth, breaker
+    state, its own counters). `collect` returns {label values tuple: value}.
+    """
+
+    def __init__(self, name: str, documentation: str, collect, labelnames: Tuple[str, ...] = (), kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labelnames = labelnames
+        self.kind = kind
+        _registry.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.collect().items():
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# --- Metrics -------------------------------------------------------------------
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte.",
+    ("method", "route", "status")
+)
+llm_request_duration = Histogram(
+    "llm_request_duration_seconds", "LLM call latency per provider (time to first token for streams).",
+    ("provider", "model", "framework", "mode", "outcome"), buckets=LLM_BUCKETS
+)
+llm_prompt_tokens = Counter(
+    "llm_prompt_tokens_total", "Prompt tokens reported by the provider.", ("provider", "model", "framework")
+)
+llm_completion_tokens = Counter(
+    "llm_completion_tokens_total", "Completion tokens reported by the provider.", ("provider", "model", "framework")
+)
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round trips as seen by the driver.",
+    ("command", "collection", "outcome"), buckets=MONGO_BUCKETS
+)
+quota_rejections = Counter(
+    "quota_rejections_total", "Requests refused by the daily credit limit or the burst limiter.", ("reason", "plan")
+)
+
+def record_llm_usage(provider, framework: str, usage):
+    """Token counts from an OpenAI-style `usage` object (absent for some providers/streams)."""
+    if usage is None:
+        return
+    llm_prompt_tokens.inc(getattr(usage, "prompt_tokens", 0) or 0, provider=provider.name, model=provider.model, framework=framework)
+    llm_completion_tokens.inc(getattr(usage, "completion_tokens", 0) or 0, provider=provider.name, model=provider.model, framework=framework)
+
+# --- HTTP middleware -------------------------------------------------------------
+
+class MetricsMiddleware:
+    """
+    Pure ASGI so streamed responses (SSE, exports) are timed to their last byte. Routes are
+    labelled by their path template ("/api/proposals/{proposal_id}"), never the raw path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
+
+# --- Mongo command listener ------------------------------------------------------
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Registered on the client in db.py. The driver calls these synchronously, so they stay cheap."""
+
+    def __init__(self):
+        # request_id -> collection, filled on start since the completion events don't carry it
+        self._collections: Dict[int, Optional[str]] = {}
+
+    def started(self, event):
+        if len(self._collections) > 10000:
+            # Events lost to a dropped connection; don't let the map grow without bound
+            self._collections.clear()
+        value = event.command.get(event.command_name)
+        self._collections[event.request_id] = value if isinstance(value, str) else ""
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+    def _observe(self, event, outcome: str):
+        collection = self._collections.pop(event.request_id, "")
+        mongo_command_duration.observe(
+            event.duration_micros / 1_000_000,
+            command=event.command_name,
+            collection=collection,
+            outcome=outcome,
+        )
@@ -1,34 +1,43 @@
-from authlib.integrations.starlette_client import OAuth
-from starlette.config import Config
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# authlib (and the provider registrations) are only loaded on first use: get_oauth() from the
+# OAuth routes, or warmup() from the app lifespan.
+_oauth = None
 
-# We can pass environ directly or custom Config object
-config = Config(environ=os.environ)
-oauth = OAuth(config)
+def get_oauth():
+    global _oauth
+    if _oauth is None:
+        from authlib.integrations.starlette_client import OAuth
+        from starlette.config import Config
 
-# Register Google
-oauth.register(
-    name='google',
-    client_id=os.getenv('GOOGLE_CLIENT_ID'),
-    client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    }
-)
+        # We can pass environ directly or custom Config object
+        oauth = OAuth(Config(environ=os.environ))
 
-# Register GitHub
-oauth.register(
-    name='github',
-    client_id=os.getenv('GITHUB_CLIENT_ID'),
-    client_secret=os.getenv('GITHUB_CLIENT_SECRET'),
-    access_token_url='https://github.com/login/oauth/access_token',
-    access_token_params=None,
-    authorize_url='https://github.com/login/oauth/authorize',
-    authorize_params=None,
-    api_base_url='https://api.github.com/',
-    client_kwargs={'scope': 'user:email'},
-)
+        # Register Google
+        oauth.register(
+            name='google',
+            client_id=os.getenv('GOOGLE_CLIENT_ID'),
+            client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={
+                'scope': 'openid email profile'
+            }
+        )
+
+        # Register GitHub
+        oauth.register(
+            name='github',
+            client_id=os.getenv('GITHUB_CLIENT_ID'),
+            client_secret=os.getenv('GITHUB_CLIENT_SECRET'),
+            access_token_url='https://github.com/login/oauth/access_token',
+            access_token_params=None,
+            authorize_url='https://github.com/login/oauth/authorize',
+            authorize_params=None,
+            api_base_url='https://api.github.com/',
+            client_kwargs={'scope': 'user:email'},
+        )
+        _oauth = oauth
+    return _oauth
+
+def warmup():
+    get_oauth()
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import List
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+from app.core.db import db
+from app.core import metrics, rollups
+
+logger = logging.getLogger(__name__)
+
+# Proposal history is written behind the response: routes get a client-side ObjectId back
+# right away and a background task flushes batches with insert_many / bulk_write.
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "100"))
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "0.25")) # seconds
+# While Mongo is unreachable records wait in memory; past this many the oldest are dropped
+PERSIST_MAX_QUEUE = int(os.getenv("PERSIST_MAX_QUEUE", "10000"))
+
+DUPLICATE_KEY = 11000
+
+def _transient(error: Exception) -> bool:
+    """Errors worth retrying the same write for: Mongo unreachable, failover in progress."""
+    if isinstance(error, ConnectionFailure):
+        return True
+    return isinstance(error, PyMongoError) and error.has_error_label("RetryableWriteError")
+
+class WriteBehindQueue:
+    def __init__(self, batch_size: int, interval: float, max_queue: int = PERSIST_MAX_QUEUE):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self._proposals = []
+        # Users whose rollup may be off (a rollup write failed, possibly half applied).
+        # They are rebuilt from history rather than re-sent the same $inc.
+        self._stale_rollups = set()
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._stopping = False
+        self.flushes = 0
+        self.flushed_docs = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._proposals)
+
+    async def add_proposals(self, records: List[dict]) -> List[str]:
+        """Queues proposal records and returns their ids. Records are stamped with an _id here."""
+        ids = []
+        for record in records:
+            record.setdefault("_id", ObjectId())
+            ids.append(str(record["_id"]))
+            self._proposals.append(record)
+
+        self._enforce_cap()
+
+        if self._task is None:
+            # No background flusher (CLI, scripts): write through
+            await self.flush()
+        elif len(self._proposals) >= self.batch_size:
+            self._wakeup.set()
+        return ids
+
+    def _enforce_cap(self):
+        overflow = len(self._proposals) - self.max_queue
+        if overflow > 0:
+            self._drop(self._proposals[:overflow], "write-behind queue full")
+            del self._proposals[:overflow]
+
+    def _drop(self, proposals: List[dict], reason: str):
+        self.dropped += len(proposals)
+        logger.error(
+            "Dropping %d proposal(s): %s", len(proposals), reason,
+            extra={"proposal_ids": [str(p["_id"]) for p in proposals[:20]]}
+        )
+
+    async def flush(self):
+        async with self._lock:
+            await self._rebuild_stale()
+            if not self._proposals:
+                return
+            proposals, self._proposals = self._proposals, []
+            started = time.perf_counter()
+            try:
+                inserted = await self._insert(proposals)
+            except Exception as e:
+                self.failures += 1
+                if not _transient(e):
+                    self._drop(proposals, f"insert failed: {e}")
+                    return
+                # Mongo unavailable: put the batch back and try again next tick.
+                # Re-inserting is safe, ids are fixed and duplicates are ignored.
+                logger.warning("Proposal write-behind flush failed, will retry: %s", e, extra={"queued": len(proposals)})
+                self._proposals = proposals + self._proposals
+                self._enforce_cap()
+                return
+
+            # Inserts are done and never retried from here on; a rollup failure only marks users stale
+            created = defaultdict(int)
+            for record in inserted:
+                created[(record["user_id"], record["created_at"].strftime("%Y-%m-%d"))] += 1
+            try:
+                await self._apply_rollups(created)
+            except Exception as e:
+                self.failures += 1
+                self._stale_rollups.update(user_id for user_id, _ in created)
+                logger.warning("Rollup update failed, will rebuild affected users: %s", e)
+
+            self.flushes += 1
+            self.flushed_docs += len(inserted)
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    async def _insert(self, proposals: List[dict]) -> List[dict]:
+        """Returns the proposals that are now stored. Ones rejected for good are dropped."""
+        try:
+            await db.proposals.insert_many(proposals, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates were stored by an earlier attempt whose rollups never ran, so they count
+            rejected = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY}
+            if rejected:
+                self._drop([proposals[i] for i in sorted(rejected)], f"rejected by Mongo: {e.details['writeErrors'][0].get('errmsg')}")
+                return [p for i, p in enumerate(proposals) if i not in rejected]
+        return proposals
+
+    async def _apply_rollups(self, created: dict):
+        ops = [
+            UpdateOne(
+                {"_id": user_id},
+                {"$inc": {"total": count, "status.generated": count, f"daily.{day}": count}}
+            )
+            for (user_id, day), count in created.items()
+        ]
+        if not ops:
+            return
+        result = await db.proposal_stats.bulk_write(ops, ordered=False)
+        if result.matched_count < len(ops):
+            # Some users have no rollup yet; build theirs from history (which now includes this batch)
+            user_ids = list({user_id for user_id, _ in created})
+            existing = set(await db.proposal_stats.distinct("_id", {"_id": {"$in": user_ids}}))
+            for user_id in user_ids:
+                if user_id not in existing:
+                    await rollups.rebuild(user_id)
+
+    async def _rebuild_stale(self):
+        for user_id in list(self._stale_rollups):
+            try:
+                await rollups.rebuild(user_id)
+            except Exception as e:
+                logger.warning("Rollup rebuild failed, will retry: %s", e)
+                return
+            self._stale_rollups.discard(user_id)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the flusher and drains whatever is still queued."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "flushes": self.flushes,
+            "flushed_docs": self.flushed_docs,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "stale_rollups": len(self._stale_rollups),
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+proposal_writer = WriteBehindQueue(PERSIST_BATCH_SIZE, PERSIST_FLUSH_INTERVAL)
+
+metrics.Collected("proposal_writer_queue_depth", "Proposals waiting to be written.", lambda: {(): proposal_writer.depth})
+metrics.Collected(
+    "proposal_writer_docs_total", "Proposals written or given up on after a permanent error.",
+    lambda: {("flushed",): proposal_writer.flushed_docs, ("dropped",): proposal_writer.dropped},
+    ("outcome",), kind="counter"
+)
+metrics.Collected("proposal_writer_flushes_total", "Batches flushed.", lambda: {(): proposal_writer.flushes}, kind="counter")
+metrics.Collected("proposal_writer_failures_total", "Failed flushes (retried).", lambda: {(): proposal_writer.failures}, kind="counter")
+metrics.Collected(
+    "proposal_writer_stale_rollups", "Users whose analytics rollup awaits a rebuild.",
+    lambda: {(): len(proposal_writer._stale_rollups)}
+)
+metrics.Collected(
+    "proposal_writer_last_flush_seconds", "Duration of the latest flush.", lambda: {(): proposal_writer.last_flush_ms / 1000}
+)
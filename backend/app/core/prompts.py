@@ -0,0 +1,183 @@
+import math
+import os
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+# Prompt building for proposal generation: system prompts compiled once per
+# (framework, tone band, CTA style), and long job posts compacted to a token budget
+# before they go into the user prompt.
+
+PROMPT_JOB_TOKEN_BUDGET = int(os.getenv("PROMPT_JOB_TOKEN_BUDGET", "600"))
+
+FRAMEWORK_PROMPTS = {
+    "Fast Hook": """
+    STRATEGY: FAST HOOK
+    - Goal: Grab attention in the first 3 seconds.
+    - Structure:
+      1. HOOK: One short, punchy sentence addressing their biggest pain point.
+      2. SOLUTION: Briefly state you can fix it.
+      3. CTA: Ask a simple "Yes/No" or "When" question.
+    - Omit: Background, extensive portfolio, generic greetings.
+    """,
+    "Proof-Driven": """
+    STRATEGY: PROOF-DRIVEN
+    - Goal: Build trust immediately through past wins.
+    - Structure:
+      1. RELEVANCE: Mention a similar project you solved.
+      2. OUTCOME: State the specific result (metrics if possible) of that past project.
+      3. TIE-IN: Explain how this applies to *their* job.
+      4. CTA: Ask to share that specific case study.
+    """,
+    "Problem-Solution": """
+    STRATEGY: PROBLEM-SOLUTION
+    - Goal: Show you understand the complexity.
+    - Structure:
+      1. DIAGNOSIS: Restate their problem in technical terms to show understanding.
+      2. PLAN: Bullet points (max 3) of your technical approach.
+      3. CTA: Ask a technical question about their stack/requirements.
+    """,
+    "Authority": """
+    STRATEGY: AUTHORITY
+    - Goal: Dominate the frame. You are the expert selection them.
+    - Structure:
+      1. ASSERTION: State clearly that you are the right fit.
+      2. QUALIFICATION: Minimal brag (e.g. "I've done this for X years").
+      3. NEXT STEP: Tell them to book a call if they are serious.
+    """
+}
+
+TONE_INSTRUCTIONS = {
+    "friendly": "Very friendly, warm, and enthusiastic tone.",
+    "balanced": "Balanced professional tone.",
+    "direct": "Very direct, concise, and no-nonsense tone.",
+}
+
+def tone_band(tone_level: int) -> str:
+    if tone_level < 30:
+        return "friendly"
+    if tone_level > 70:
+        return "direct"
+    return "balanced"
+
+@lru_cache(maxsize=128)
+def system_prompt(framework: str, band: str, cta_style: str) -> str:
+    framework_instruction = FRAMEWORK_PROMPTS.get(framework, FRAMEWORK_PROMPTS["Fast Hook"])
+    return f"""
+    You are an expert freelancer. Write a proposal based on the following framework.
+    
+    {framework_instruction}
+    
+    ADDITIONAL RULES:
+    - Tone: {TONE_INSTRUCTIONS[band]}
+    - CTA Style: {cta_style} (e.g. Soft = "chat?", Confident = "ready?", Action = "see demo").
+    - MAX 150 Words.
+    - NO placeholders.
+    """
+
+# --- Token counting ------------------------------------------------------------
+# No tokenizer dependency: words are counted as ~4 characters per token and each
+# punctuation mark as one, which tracks BPE tokenizers closely enough for budgeting.
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+def count_tokens(text: str) -> int:
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECES.findall(text))
+
+# --- Compaction ----------------------------------------------------------------
+
+# Instructions older frontends appended to the job text, e.g. "[SYSTEM: use a friendly tone]"
+_INSTRUCTIONS = re.compile(r"\[SYSTEM[^\]]*\]", re.IGNORECASE)
+# Sentence ends: . ! ? followed by whitespace (so "Node.js" and "$1.5k" stay whole), or a line break
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_REQUIREMENT = re.compile(
+    r"\b(must|should|need|needs|required?|requirements?|responsib\w*|deliver\w*|experience|"
+    r"skills?|years?|deadline|budget|scope|stack|integrat\w*|build|migrat\w*|fix|implement\w*|"
+    r"design|api|database|timeline|milestone)\b|\$|\d",
+    re.IGNORECASE
+)
+_BOILERPLATE = re.compile(
+    r"\b(about us|we are a|our company|our team|our mission|equal opportunity|benefits|"
+    r"thank you|thanks|looking forward|good luck|apply|applicants?|cover letter|"
+    r"hello|dear|regards|cheers)\b",
+    re.IGNORECASE
+)
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """Cuts `text` at the last piece that fits in `budget` tokens."""
+    used = 0
+    for piece in _PIECES.finditer(text):
+        used += math.ceil(len(piece.group()) / 4)
+        if used > budget:
+            return text[:piece.start()].rstrip() or text[:max(1, budget) * 4]
+    return text
+
+def strip_instructions(job_description: str) -> str:
+    return _INSTRUCTIONS.sub("", job_description).strip()
+
+def _sentence_score(sentence: str) -> int:
+    score = 2 * len(_REQUIREMENT.findall(sentence))
+    if _BOILERPLATE.search(sentence):
+        score -= 3
+    if sentence.lstrip().startswith(("-", "*", "•")):
+        score += 1 # Bullet points are usually requirements
+    return score
+
+@lru_cache(maxsize=512)
+def compact_job_description(job_description: str, budget: int = PROMPT_JOB_TOKEN_BUDGET) -> str:
+    """
+    Drops boilerplate and keeps the requirement-bearing sentences, in original order, until
+    the token budget is used. Posts already within budget are only stripped of instructions.
+    If no sentence fits on its own, the top-ranked one is truncated, so the result is never empty
+    for a non-empty post.
+    """
+    text = strip_instructions(job_description)
+    if count_tokens(text) <= budget:
+        return text
+
+    sentences = [s.strip() for s in _SENTENCE_BREAK.split(text) if s.strip()]
+    # The opening sentence is usually the summary/title, keep it whatever it scores
+    ranked = [0] + sorted(range(1, len(sentences)), key=lambda i: _sentence_score(sentences[i]), reverse=True)
+
+    kept = set()
+    used = 0
+    for i in ranked:
+        if i > 0 and _sentence_score(sentences[i]) < 0:
+            break
+        cost = count_tokens(sentences[i])
+        if used + cost > budget:
+            continue
+        kept.add(i)
+        used += cost
+    if not kept:
+        return truncate_tokens(sentences[ranked[0]] if sentences else text, budget)
+    return "\n".join(sentences[i] for i in sorted(kept))
+
+def _user_prompt(user_profile: dict, job_description: str) -> str:
+    return f"""
+    MY PROFILE:
+    Skill: {user_profile.get('skill', 'General')}
+    Niche: {user_profile.get('niche', 'General')}
+    Experience: {user_profile.get('experience', 'Mid')}
+    
+    JOB DESCRIPTION:
+    {job_description}
+    """
+
+def build_proposal_messages(job_description: str, user_profile: dict, framework: str, cta_style: str, tone_level: int) -> Tuple[List[dict], dict]:
+    """
+    Returns the chat messages and the estimated prompt tokens before and after compaction
+    ({"prompt_tokens_raw", "prompt_tokens"}).
+    """
+    system = system_prompt(framework, tone_band(tone_level), cta_style)
+    user = _user_prompt(user_profile, compact_job_description(job_description))
+    system_tokens = count_tokens(system)
+    stats = {
+        "prompt_tokens_raw": system_tokens + count_tokens(_user_prompt(user_profile, job_description)),
+        "prompt_tokens": system_tokens + count_tokens(user),
+    }
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user}
+    ], stats
@@ -0,0 +1,372 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+from app.core import metrics
+
+# Routes LLM calls across one or more OpenAI-compatible providers.
+#
+# Providers come from LLM_PROVIDERS, a JSON list like
+#   [{"name": "groq", "base_url": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY", "model": "llama-3.3-70b-versatile"},
+#    {"name": "openai", "api_key_env": "OPENAI_API_KEY", "model": "gpt-3.5-turbo"}]
+# ("api_key" may be given inline instead of "api_key_env"). Without it we fall back to the old
+# behaviour: Groq if GROQ_API_KEY is set, OpenAI if OPENAI_API_KEY is set, in that order.
+#
+# Each call goes to the healthiest, fastest provider (latency and error EWMAs), fails over
+# to the next one on error/timeout, and skips providers whose circuit breaker is open.
+# With LLM_HEDGE on, a second provider is raced once the first is slower than its own p95.
+#
+# The router is built from the environment at import, but `openai`/`httpx` are only imported
+# and the clients only constructed by warmup() (app lifespan) or the first call.
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "500"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "100"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60")) # per call, per provider
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "15")) # streams only
+
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5")) # consecutive failures to open
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30")) # seconds before a trial call
+
+LLM_HEDGE = os.getenv("LLM_HEDGE", "").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0")) # seconds, floor for the p95 delay
+
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 200 # samples kept for the p95
+
+class ProviderError(Exception):
+    pass
+
+class Provider:
+    def __init__(self, name: str, base_url: Optional[str], api_key: str, model: str, router: "ProviderRouter"):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self._api_key = api_key
+        self._router = router
+        self._client = None
+        self.latency_ewma = None # seconds
+        self.error_ewma = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probing = False # a half-open trial call is in flight
+        self.calls = 0
+        self.failures = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            # No SDK retries: the router owns retries and failover, and every attempt has to
+            # reach the breaker and EWMAs as exactly one success or failure
+            self._client = AsyncOpenAI(
+                api_key=self._api_key, base_url=self.base_url, http_client=self._router.get_http_client(), max_retries=0
+            )
+        return self._client
+
+    # --- circuit breaker ---
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= LLM_BREAKER_COOLDOWN:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.probing)
+
+    def begin_call(self) -> bool:
+        """Claims the single trial call of a half-open provider. False if another call already has it."""
+        if self.state == "half_open":
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def end_call(self):
+        # Call abandoned (cancelled): free the trial slot without judging the provider
+        self.probing = False
+
+    def record_success(self, latency: float):
+        self.calls += 1
+        self.latencies.append(latency)
+        self.latency_ewma = latency if self.latency_ewma is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency_ewma
+        self.error_ewma = (1 - EWMA_ALPHA) * self.error_ewma
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.calls += 1
+        self.failures += 1
+        self.error_ewma = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_ewma
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= LLM_BREAKER_FAILURES:
+            # (Re)open; a half-open trial that fails waits a full cooldown again
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    # --- selection ---
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def score(self) -> float:
+        # Expected latency (seconds) inflated by recent errors, plus up to a second of penalty
+        # for a provider that has only been failing. Unmeasured providers go first so they get measured.
+        latency = self.latency_ewma or 0.0
+        return latency * (1 + 4 * self.error_ewma) + self.error_ewma
+
+class ProviderRouter:
+    def __init__(self):
+        self.providers: List[Provider] = []
+        self.http_client = None
+        # warmup() builds the client in a worker thread while requests may already need it
+        self._http_client_lock = threading.Lock()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def get_http_client(self):
+        # One pooled keep-alive httpx client shared by every provider
+        if self.http_client is None:
+            with self._http_client_lock:
+                if self.http_client is None:
+                    import httpx
+                    from openai import DefaultAsyncHttpxClient
+                    self.http_client = DefaultAsyncHttpxClient(
+                        limits=httpx.Limits(
+                            max_connections=LLM_MAX_CONNECTIONS,
+                            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                            keepalive_expiry=30
+                        ),
+                        timeout=httpx.Timeout(LLM_TIMEOUT, connect=5.0)
+                    )
+        return self.http_client
+
+    def warmup(self):
+        """Imports the SDK and builds every provider's client. Blocking; run it off the event loop."""
+        for provider in self.providers:
+            provider.client
+
+    def ranked(self) -> List[Provider]:
+        candidates = [p for p in self.providers if p.available()]
+        if not candidates:
+            # Everything is open: try them all anyway rather than failing without a call
+            candidates = list(self.providers)
+        return sorted(candidates, key=lambda p: p.score())
+
+    async def _call(self, provider: Provider, params: dict, framework: str) -> str:
+        if not provider.begin_call():
+            raise ProviderError(f"{provider.name}: recovering, trial call already in flight")
+        started = time.monotonic()
+        try:
+            response = await asyncio.wait_for(
+                provider.client.chat.completions.create(model=provider.model, **params),
+                timeout=LLM_TIMEOUT
+            )
+            text = response.choices[0].message.content.strip()
+        except asyncio.CancelledError:
+            # Lost a hedge race; not the provider's fault
+            provider.end_call()
+            raise
+        except Exception:
+            provider.record_failure()
+            self._observe(provider, framework, "complete", "error", time.monotonic() - started)
+            raise
+        latency = time.monotonic() - started
+        provider.record_success(latency)
+        self._observe(provider, framework, "complete", "ok", latency)
+        metrics.record_llm_usage(provider, framework, getattr(response, "usage", None))
+        return text
+
+    @staticmethod
+    def _observe(provider: Provider, framework: str, mode: str, outcome: str, latency: float):
+        metrics.llm_request_duration.observe(
+            latency, provider=provider.name, model=provider.model, framework=framework, mode=mode, outcome=outcome
+        )
+
+    async def complete(self, params: dict, framework: str = "") -> str:
+        """
+        One chat completion (params without `model`), with failover and optional hedging.
+        `framework` only labels the metrics.
+        """
+        ranked = self.ranked()
+        if not ranked:
+            raise ProviderError("AI API Key not configured.")
+
+        last_error = None
+        index = 0
+        while index < len(ranked):
+            primary = ranked[index]
+            backup = ranked[index + 1] if LLM_HEDGE and index + 1 < len(ranked) else None
+            try:
+                if backup is None:
+                    return await self._call(primary, params, framework)
+                return await self._hedged(primary, backup, params, framework)
+            except Exception as e:
+                last_error = e
+                self.failovers += 1
+                # A hedged attempt already used the backup
+                index += 2 if backup is not None else 1
+        raise ProviderError(str(last_error))
+
+    async def _hedged(self, primary: Provider, backup: Provider, params: dict, framework: str) -> str:
+        delay = max(LLM_HEDGE_MIN_DELAY, primary.p95() or 0)
+        first = asyncio.ensure_future(self._call(primary, params, framework))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                if first.exception() is None:
+                    return first.result()
+                # Failed fast: no race, just fall through to the backup
+                return await self._call(backup, params, framework)
+
+            self.hedges += 1
+            second = asyncio.ensure_future(self._call(backup, params, framework))
+            tasks.append(second)
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser (or both, if our caller went away) is cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def stream(self, params: dict, framework: str = ""):
+        """
+        Yields text deltas. Fails over to the next provider only before the first delta
+        arrives; after that an error is raised to the caller.
+        """
+        ranked = self.ranked()
+        if not ranked:
+            raise ProviderError("AI API Key not configured.")
+
+        last_error = None
+        for provider in ranked:
+            if not provider.begin_call():
+                continue
+            started = time.monotonic()
+            try:
+                stream = await asyncio.wait_for(
+                    provider.client.chat.completions.create(
+                        model=provider.model, stream=True, stream_options={"include_usage": True}, **params
+                    ),
+                    timeout=LLM_FIRST_TOKEN_TIMEOUT
+                )
+                iterator = stream.__aiter__()
+                first = await asyncio.wait_for(self._next_delta(iterator), timeout=LLM_FIRST_TOKEN_TIMEOUT)
+            except asyncio.CancelledError:
+                provider.end_call()
+                raise
+            except Exception as e:
+                provider.record_failure()
+                self._observe(provider, framework, "stream", "error", time.monotonic() - started)
+                last_error = e
+                self.failovers += 1
+                continue
+
+            # Time to first token is what users feel, so that's the latency we track for streams
+            latency = time.monotonic() - started
+            provider.record_success(latency)
+            self._observe(provider, framework, "stream", "ok", latency)
+            if first is not None:
+                yield first
+            async for chunk in iterator:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                # With include_usage the last chunk has no choices, only the token counts
+                metrics.record_llm_usage(provider, framework, getattr(chunk, "usage", None))
+            return
+        raise ProviderError(str(last_error) if last_error else "No provider available right now.")
+
+    @staticmethod
+    async def _next_delta(iterator) -> Optional[str]:
+        async for chunk in iterator:
+            if chunk.choices and chunk.choices[0].delta.content:
+                return chunk.choices[0].delta.content
+        return None
+
+    async def close(self):
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+            for provider in self.providers:
+                provider._client = None
+
+def _provider_configs() -> list:
+    raw = os.getenv("LLM_PROVIDERS")
+    if raw:
+        return json.loads(raw)
+    configs = []
+    if os.getenv("GROQ_API_KEY"):
+        configs.append({"name": "groq", "base_url": "https://api.groq.com/openai/v1", "api_key_env": "GROQ_API_KEY", "model": "llama-3.3-70b-versatile"})
+    if os.getenv("OPENAI_API_KEY"):
+        configs.append({"name": "openai", "api_key_env": "OPENAI_API_KEY", "model": "gpt-3.5-turbo"})
+    return configs
+
+def build_router() -> ProviderRouter:
+    router = ProviderRouter()
+    for config in _provider_configs():
+        api_key = config.get("api_key") or os.getenv(config.get("api_key_env", ""), "")
+        if not api_key:
+            continue
+        router.providers.append(Provider(
+            name=config.get("name", config.get("base_url") or "openai"),
+            base_url=config.get("base_url"),
+            api_key=api_key,
+            model=config["model"],
+            router=router
+        ))
+    return router
+
+router = build_router()
+
+def _per_provider(value) -> dict:
+    return {(p.name, p.model): value(p) for p in router.providers}
+
+metrics.Collected(
+    "llm_provider_state", "Circuit breaker state per provider: 1 for the current state.",
+    lambda: {(p.name, p.model, state): int(p.state == state) for p in router.providers for state in ("closed", "open", "half_open")},
+    ("provider", "model", "state")
+)
+metrics.Collected(
+    "llm_provider_calls_total", "Calls made to each provider.", lambda: _per_provider(lambda p: p.calls),
+    ("provider", "model"), kind="counter"
+)
+metrics.Collected(
+    "llm_provider_failures_total", "Failed calls per provider.", lambda: _per_provider(lambda p: p.failures),
+    ("provider", "model"), kind="counter"
+)
+metrics.Collected(
+    "llm_provider_latency_ewma_seconds", "Latency EWMA used to rank providers.",
+    lambda: _per_provider(lambda p: p.latency_ewma), ("provider", "model")
+)
+metrics.Collected(
+    "llm_provider_error_ewma", "Error-rate EWMA used to rank providers.", lambda: _per_provider(lambda p: p.error_ewma),
+    ("provider", "model")
+)
+metrics.Collected(
+    "llm_router_events_total", "Hedged calls, hedges that answered first, and failovers to another provider.",
+    lambda: {("hedge",): router.hedges, ("hedge_win",): router.hedge_wins, ("failover",): router.failovers},
+    ("event",), kind="counter"
+)
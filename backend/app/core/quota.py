@@ -0,0 +1,105 @@
+import os
+import time
+from datetime import datetime
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from app.core.db import db
+from app.core import user_cache
+from app.core.metrics import quota_rejections
+
+# Daily generation credits per plan. Unknown/paid plans get the default.
+PLAN_LIMITS = {"free": 1} # STRICT 1/day for free users as per Plan
+DEFAULT_LIMIT = 100
+
+# Optional per-user burst limiter (requests per second / bucket size). 0 disables it.
+# It is per process; the daily credit counter below is what holds across workers.
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+
+def plan_limit(plan: str) -> int:
+    return PLAN_LIMITS.get(plan, DEFAULT_LIMIT)
+
+def today() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+def current_usage(user: dict) -> int:
+    """Usage as of today from a (possibly cached) user doc. Only for display; reserve() is authoritative."""
+    if user.get("last_usage_date") != today():
+        return 0
+    return user.get("daily_usage", 0)
+
+def limit_message(limit: int) -> str:
+    return f"Daily limit of {limit} reached. Upgrade to Pro for more."
+
+def limit_exceeded(limit: int, plan: str = "") -> HTTPException:
+    """The 403 for a refused request; counts the rejection, so build it once per request."""
+    quota_rejections.inc(reason="daily_limit", plan=plan)
+    return HTTPException(status_code=403, detail=limit_message(limit))
+
+async def reserve(user: dict, count: int = 1, partial: bool = False) -> dict:
+    """
+    Atomically takes `count` credits from today's allowance in one find_one_and_update,
+    resetting the counter first if the stored date is not today.
+
+    With partial=True as many credits as are left (up to `count`) are granted instead of
+    all-or-nothing. Returns {"granted", "usage", "limit"}; raises 403 when nothing is granted.
+    """
+    limit = plan_limit(user.get("plan", "free"))
+    day = today()
+    need = 1 if partial else count
+    if need > limit:
+        raise limit_exceeded(limit, user.get("plan", "free"))
+
+    same_day = {"$eq": ["$last_usage_date", day]}
+    base = {"$cond": [same_day, {"$ifNull": ["$daily_usage", 0]}, 0]}
+
+    before = await db.users.find_one_and_update(
+        {
+            "_id": user["_id"],
+            "$or": [
+                {"last_usage_date": {"$ne": day}},
+                {"daily_usage": {"$lte": limit - need}},
+            ],
+        },
+        [{"$set": {
+            "daily_usage": {"$min": [limit, {"$add": [base, count]}]},
+            "last_usage_date": day,
+        }}],
+        projection={"daily_usage": 1, "last_usage_date": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    user_cache.invalidate_user(user["_id"])
+
+    if before is None:
+        raise limit_exceeded(limit, user.get("plan", "free"))
+
+    used = before.get("daily_usage", 0) if before.get("last_usage_date") == day else 0
+    granted = min(count, limit - used)
+    return {"granted": granted, "usage": used + granted, "limit": limit}
+
+async def refund(user: dict, count: int = 1):
+    """Gives back credits for generations that failed. Never crosses a day boundary or goes below zero."""
+    if count <= 0:
+        return
+    await db.users.update_one(
+        {"_id": user["_id"], "last_usage_date": today(), "daily_usage": {"$gte": count}},
+        {"$inc": {"daily_usage": -count}}
+    )
+    user_cache.invalidate_user(user["_id"])
+
+# user id -> (tokens, last refill time)
+_buckets = {}
+
+def check_rate_limit(user: dict):
+    """Token bucket per user. Raises 429 when the burst allowance is used up."""
+    if RATE_LIMIT_PER_SECOND <= 0:
+        return
+    key = str(user["_id"])
+    now = time.monotonic()
+    tokens, last = _buckets.get(key, (RATE_LIMIT_BURST, now))
+    tokens = min(RATE_LIMIT_BURST, tokens + (now - last) * RATE_LIMIT_PER_SECOND)
+    if tokens < 1:
+        _buckets[key] = (tokens, now)
+        quota_rejections.inc(reason="rate_limit", plan=user.get("plan", "free"))
+        raise HTTPException(status_code=429, detail="Too many requests. Slow down a little.")
+    _buckets[key] = (tokens - 1, now)
@@ -0,0 +1,72 @@
+"""
+Per-user proposal analytics kept up to date with $inc, so the dashboard reads one document
+instead of counting the whole history. One document per user in `proposal_stats`:
+
+    {"_id": user_id, "total": 12, "status": {"generated": 9, "replied": 3}, "daily": {"2026-01-10": 4}}
+
+    python -m app.core.rollups                 # rebuild every user's rollup from db.proposals
+    python -m app.core.rollups <user_id>       # rebuild one user
+"""
+import asyncio
+import sys
+from typing import Optional
+from bson import ObjectId
+from app.core.db import db
+
+async def record_status_change(user_id, old_status: Optional[str], new_status: str):
+    old_status = old_status or "generated"
+    if old_status == new_status:
+        return
+    await db.proposal_stats.update_one(
+        {"_id": user_id},
+        {"$inc": {f"status.{old_status}": -1, f"status.{new_status}": 1}}
+    )
+
+async def get(user_id) -> dict:
+    """Returns the user's rollup, building it from raw proposals the first time (e.g. pre-rollup history)."""
+    stats = await db.proposal_stats.find_one({"_id": user_id})
+    if stats is None:
+        stats = await rebuild(user_id)
+    return stats
+
+async def rebuild(user_id) -> dict:
+    """Recomputes one user's rollup from db.proposals and replaces the stored document."""
+    by_status = await (await db.proposals.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": {"$ifNull": ["$status", "generated"]}, "count": {"$sum": 1}}},
+    ])).to_list()
+    by_day = await (await db.proposals.aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}, "count": {"$sum": 1}}},
+    ])).to_list()
+
+    stats = {
+        "_id": user_id,
+        "total": sum(s["count"] for s in by_status),
+        "status": {s["_id"]: s["count"] for s in by_status},
+        "daily": {d["_id"]: d["count"] for d in by_day if d["_id"]},
+    }
+    await db.proposal_stats.replace_one({"_id": user_id}, stats, upsert=True)
+    return stats
+
+async def rebuild_all() -> int:
+    user_ids = await db.proposals.distinct("user_id")
+    for user_id in user_ids:
+        await rebuild(user_id)
+    return len(user_ids)
+
+async def _main(args: list) -> int:
+    from app.core.db import close
+    try:
+        if args:
+            await rebuild(ObjectId(args[0]))
+            print(f"Rebuilt rollup for {args[0]}.")
+        else:
+            count = await rebuild_all()
+            print(f"Rebuilt rollups for {count} users.")
+        return 0
+    finally:
+        await close()
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
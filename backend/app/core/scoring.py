@@ -0,0 +1,84 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+# Reply strength scoring. Same heuristics as the original calculate_reply_strength
+# (length, keyword relevance, question/CTA, paragraphs) but the job side is tokenized
+# once into a keyword set and matching is a set intersection instead of a substring scan.
+
+MIN_KEYWORD_LENGTH = 6 # Original rule: words longer than 5 characters
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+# Only words that pass the length filter need to be listed. Mix of common English
+# filler and job-post boilerplate that says nothing about relevance.
+STOPWORDS = frozenset("""
+    across actually against almost already although always another anyone anything
+    around before behind between beyond cannot certain during either enough
+    especially everyone everything further having however itself likely little
+    mostly myself nothing others otherwise perhaps please pretty rather really
+    should something sometimes somewhere themselves therefore things thanks through
+    together toward towards unless usually within without yourself yourselves
+    whether whatever whenever wherever whichever regards looking someone anybody
+    interested kindly required requirements candidate candidates freelancer
+    freelancers applicant applicants hiring position currently possible ability
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+@lru_cache(maxsize=1024)
+def job_keywords(job_description: str) -> frozenset:
+    """Precomputed keyword index for a job post. Cached so variants/batches scored against the same post reuse it."""
+    return frozenset(
+        w for w in tokenize(job_description)
+        if len(w) >= MIN_KEYWORD_LENGTH and w not in STOPWORDS
+    )
+
+def score_reply(reply: str, job_description: str) -> dict:
+    score = 50 # Base score
+    breakdown = []
+
+    # 1. Length Check (Optimal: 50-150 words)
+    word_count = len(reply.split())
+    if 50 <= word_count <= 150:
+        score += 10
+        breakdown.append("Perfect Length")
+    elif word_count < 50:
+        breakdown.append("Too Short")
+    else:
+        score -= 5
+        breakdown.append("Too Long")
+
+    # 2. Key Terms (Relevance)
+    matches = len(job_keywords(job_description).intersection(tokenize(reply)))
+
+    if matches > 2:
+        score += 15
+        breakdown.append("Good Keyword Usage")
+    elif matches > 0:
+        score += 5
+    else:
+        breakdown.append("Missed Keywords")
+
+    # 3. Question/CTA Check
+    if "?" in reply:
+        score += 15
+        breakdown.append("Clear CTA")
+    else:
+        score -= 10
+        breakdown.append("Missing Question")
+
+    # 4. formatting
+    if "\n" in reply: # Paragraphs used
+        score += 10
+
+    return {
+        "score": min(100, max(0, score)),
+        "breakdown": breakdown,
+        "label": "Strong" if score > 80 else "Average" if score > 60 else "Weak"
+    }
+
+def score_replies(pairs: Iterable[Tuple[str, str]]) -> List[dict]:
+    """Scores many (reply, job_description) pairs; posts shared between pairs are indexed once."""
+    return [score_reply(reply, job_description) for reply, job_description in pairs]
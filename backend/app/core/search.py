@@ -0,0 +1,61 @@
+import re
+from functools import lru_cache
+from typing import List, Optional, Pattern
+
+# Highlighting for proposal search. Matching itself is Mongo's $text (see the user_text index
+# in indexes.py); this only finds where the query terms appear in the stored text so the client
+# can mark them. Highlights are returned as character ranges into a snippet, never as HTML.
+
+SNIPPET_CHARS = 240
+# Mongo stems English terms ("migrating" finds "migration"), so a term matches any word
+# starting with its first few characters
+STEM_PREFIX = 5
+
+_TERM = re.compile(r'"([^"]+)"|(-?)(\S+)')
+_WORD = re.compile(r"\w+")
+
+@lru_cache(maxsize=256)
+def query_pattern(q: str) -> Optional[Pattern]:
+    """One case-insensitive regex for the positive terms and phrases of a $text search string."""
+    alternatives = []
+    for phrase, negated, term in _TERM.findall(q):
+        if phrase:
+            alternatives.append(re.escape(phrase.strip()))
+            continue
+        if negated:
+            continue
+        for word in _WORD.findall(term):
+            alternatives.append(re.escape(word[:STEM_PREFIX]) + r"\w*")
+    if not alternatives:
+        return None
+    # Longest first so a phrase wins over its own words
+    alternatives.sort(key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")", re.IGNORECASE)
+
+def highlight(text: Optional[str], pattern: Optional[Pattern]) -> Optional[dict]:
+    """
+    {"snippet", "matches"} for the window of `text` around the first match, with matches as
+    [start, end] offsets into the snippet. None when nothing matches.
+    """
+    if not text or pattern is None:
+        return None
+    first = pattern.search(text)
+    if first is None:
+        return None
+
+    start = max(0, first.start() - SNIPPET_CHARS // 4)
+    end = min(len(text), start + SNIPPET_CHARS)
+    # Don't cut words in half at either edge
+    if start > 0:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < first.start() else start
+    if end < len(text):
+        space = text.rfind(" ", first.end(), end)
+        end = space if space > 0 else end
+
+    window = text[start:end]
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    snippet = prefix + window + suffix
+    matches: List[list] = [[m.start() + len(prefix), m.end() + len(prefix)] for m in pattern.finditer(window)]
+    return {"snippet": snippet, "matches": matches}
@@ -1,22 +1,79 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import asyncio
+import multiprocessing
 import os
+from fastapi import HTTPException
 from fastapi.security import OAuth2PasswordBearer
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecr3t_key_for_dev_only")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost. Raising it makes existing hashes "deprecated"; they are rehashed on next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hashing runs in its own processes so a login burst can't starve the event loop or threadpool.
+# Past PASSWORD_HASH_QUEUE in-flight operations we answer 429 instead of queueing.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# --- Worker pool ---------------------------------------------------------------
+# These run in the pool's child processes, so they take the cost explicitly.
+
+@lru_cache(maxsize=4)
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+_pool = None
+_inflight = 0
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: forking a process that already runs an event loop and threads is unsafe
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+async def _run_in_pool(fn, *args):
+    global _inflight
+    if _inflight >= PASSWORD_HASH_QUEUE:
+        raise HTTPException(status_code=429, detail="Too many sign-in attempts right now. Try again shortly.", headers={"Retry-After": "1"})
+    _inflight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        _inflight -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run_in_pool(_hash, password, BCRYPT_ROUNDS)
+
+async def check_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Returns (valid, new_hash). new_hash is set when the stored hash used a different cost
+    and should be saved in its place.
+    """
+    if not hashed_password:
+        # OAuth accounts have no password
+        return False, None
+    return await _run_in_pool(_verify_and_update, password, hashed_password, BCRYPT_ROUNDS)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -0,0 +1,58 @@
+import re
+from typing import Iterable, List
+
+# Job signal rules for the UI badges. To add a signal, add a rule here; all rules are
+# compiled into one alternation so detection is still a single pass over the text.
+# Terms match on word boundaries ("rate" no longer fires inside "accurate"), so
+# inflections that should count are listed explicitly.
+SIGNAL_RULES = [
+    {
+        "label": "Urgent", "code": "urgent", "color": "red",
+        "terms": ["urgent", "urgently", "asap", "immediately", "immediate start", "deadline", "deadlines"],
+    },
+    {
+        "label": "Budget Mentioned", "code": "budget", "color": "green",
+        "terms": ["budget", "budgets", "price", "prices", "pricing", "fixed", "fixed price",
+                  "rate", "rates", "hourly rate", "$"],
+    },
+    {
+        "label": "Long Term", "code": "long_term", "color": "blue",
+        "terms": ["long term", "ongoing", "contract", "contracts", "full time"],
+    },
+    {
+        "label": "High Intent", "code": "high_intent", "color": "purple",
+        "terms": ["expert", "experts", "expertise", "senior", "advanced", "experience", "experienced"],
+    },
+]
+
+def _term_pattern(term: str) -> str:
+    # Spaces match any run of whitespace or hyphens ("full time", "full-time")
+    pattern = r"[\s\-]+".join(re.escape(part) for part in term.split())
+    if re.match(r"\w", term):
+        pattern = r"\b" + pattern
+    if re.search(r"\w$", term):
+        pattern = pattern + r"\b"
+    return pattern
+
+def _compile(rules: list) -> re.Pattern:
+    groups = []
+    for rule in rules:
+        # Longest first so "fixed price" wins over "fixed" inside the same group
+        terms = sorted(rule["terms"], key=len, reverse=True)
+        groups.append(f"(?P<{rule['code']}>{'|'.join(_term_pattern(t) for t in terms)})")
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+_MATCHER = _compile(SIGNAL_RULES)
+_BADGES = {rule["code"]: {k: rule[k] for k in ("label", "code", "color")} for rule in SIGNAL_RULES}
+
+def detect_signals(text: str) -> list:
+    found = set()
+    for match in _MATCHER.finditer(text):
+        found.add(match.lastgroup)
+        if len(found) == len(_BADGES):
+            break
+    # Same order as SIGNAL_RULES, fresh dicts so callers can't mutate the shared badges
+    return [dict(_BADGES[code]) for code in _BADGES if code in found]
+
+def detect_signals_batch(texts: Iterable[str]) -> List[list]:
+    return [detect_signals(text) for text in texts]
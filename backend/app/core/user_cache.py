@@ -0,0 +1,55 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# User docs are cached briefly so other workers' writes show up quickly.
+# Decoded tokens only map token -> user id, which can't change, so they live until the JWT expires.
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30")) # seconds
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+class _TTLCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at: float):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+_tokens = _TTLCache(USER_CACHE_SIZE)
+_users = _TTLCache(USER_CACHE_SIZE)
+
+def get_token_user_id(token: str) -> Optional[str]:
+    return _tokens.get(token)
+
+def set_token_user_id(token: str, user_id: str, expires_at: float):
+    _tokens.set(token, user_id, expires_at)
+
+def get_user(user_id: str) -> Optional[dict]:
+    user = _users.get(user_id)
+    # Routes add keys to current_user, so never hand out the cached dict itself
+    return dict(user) if user is not None else None
+
+def set_user(user: dict):
+    _users.set(str(user["_id"]), dict(user), time.time() + USER_CACHE_TTL)
+
+def invalidate_user(user_id):
+    """Call after any write to a user document (profile, usage counters, plan)."""
+    _users.pop(str(user_id))
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class IncomeEntry(BaseModel):
+    id: str
+    amount: float
+    client: Optional[str] = None
+    platform: Optional[str] = None
+    date: str # YYYY-MM-DD
+
+class MonthlyTotal(BaseModel):
+    # Sent as "_id" (the shape of the old $group result the frontend was written against)
+    month: str = Field(serialization_alias="_id")
+    total: float
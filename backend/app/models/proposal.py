@@ -0,0 +1,42 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class ProposalSummary(BaseModel):
+    id: str
+    job_description: Optional[str] = None
+    platform: Optional[str] = None
+    framework: Optional[str] = None
+    score: Optional[int] = None
+    status: str = "generated"
+    prompt_tokens_raw: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    created_at: datetime
+
+class Proposal(ProposalSummary):
+    full_job_description: Optional[str] = None
+    proposal_text: Optional[str] = None
+
+class Highlight(BaseModel):
+    snippet: str
+    matches: List[List[int]] # [start, end) character offsets into snippet
+
+class SearchHit(ProposalSummary):
+    relevance: float
+    job_highlight: Optional[Highlight] = None
+    proposal_highlight: Optional[Highlight] = None
+
+class ChartPoint(BaseModel):
+    name: str # YYYY-MM-DD
+    sent: int
+
+class FunnelStep(BaseModel):
+    name: str
+    value: int
+
+class Analytics(BaseModel):
+    total_proposals: int
+    response_rate: float
+    profile_views: int
+    chart_data: List[ChartPoint]
+    funnel_data: List[FunnelStep]
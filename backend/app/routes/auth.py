@@ -2,22 +2,25 @@ from fastapi import APIRouter, HTTPException, status, Depends, Body, Request
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.models.user import UserCreate, UserLogin, UserResponse, UserInDB, UserProfile
-from app.core.security import get_password_hash, verify_password, create_access_token, oauth2_scheme
+from app.core.security import hash_password, check_password, create_access_token, oauth2_scheme
 from app.core.db import db
-from app.core.oauth import oauth
+from app.core.oauth import get_oauth
 from datetime import timedelta
 from bson import ObjectId
+import logging
 import os
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.post("/register", response_model=dict)
-def register(user: UserCreate):
-    existing_user = db.users.find_one({"email": user.email})
+async def register(user: UserCreate):
+    existing_user = await db.users.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    # bcrypt runs in the hashing worker pool (429 when it's saturated)
+    hashed_password = await hash_password(user.password)
     new_user = UserInDB(
         email=user.email,
         hashed_password=hashed_password,
@@ -27,25 +30,31 @@ def register(user: UserCreate):
     
     # Insert
     user_dict = new_user.dict()
-    result = db.users.insert_one(user_dict)
+    result = await db.users.insert_one(user_dict)
     
     # Token
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data={"sub": user.email, "uid": str(result.inserted_id)})
     return {"access_token": access_token, "token_type": "bearer", "user_id": str(result.inserted_id)}
 
 @router.post("/login", response_model=dict)
-def login_json(user_login: UserLogin):
-    user = db.users.find_one({"email": user_login.email})
-    if not user or not verify_password(user_login.password, user["hashed_password"]):
+async def login_json(user_login: UserLogin):
+    user = await db.users.find_one({"email": user_login.email})
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    valid, new_hash = await check_password(user_login.password, user.get("hashed_password", ""))
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # bcrypt cost changed since this hash was made
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
     
-    access_token = create_access_token(data={"sub": user["email"]})
+    access_token = create_access_token(data={"sub": user["email"], "uid": str(user["_id"])})
     return {"access_token": access_token, "token_type": "bearer", "user": {"email": user["email"], "id": str(user["_id"])}}
 
 # OAuth Routes
 @router.get("/login/{provider}")
 async def login_oauth(provider: str, request: Request):
-    request_oauth = oauth.create_client(provider)
+    request_oauth = get_oauth().create_client(provider)
     if not request_oauth:
         raise HTTPException(status_code=404, detail="Provider not found")
     
@@ -54,7 +63,7 @@ async def login_oauth(provider: str, request: Request):
 
 @router.get("/callback/{provider}")
 async def auth_callback(provider: str, request: Request):
-    request_oauth = oauth.create_client(provider)
+    request_oauth = get_oauth().create_client(provider)
     if not request_oauth:
         raise HTTPException(status_code=404, detail="Provider not found")
     
@@ -77,7 +86,7 @@ async def auth_callback(provider: str, request: Request):
              raise HTTPException(status_code=400, detail="Could not retrieve email from provider")
 
         # Check existing user
-        user = db.users.find_one({"email": email})
+        user = await db.users.find_one({"email": email})
         if not user:
             # Create new user
             new_user = UserInDB(
@@ -87,13 +96,13 @@ async def auth_callback(provider: str, request: Request):
                 daily_usage=0,
                 provider=provider
             )
-            result = db.users.insert_one(new_user.dict())
+            result = await db.users.insert_one(new_user.dict())
             user_id = str(result.inserted_id)
         else:
             user_id = str(user["_id"])
             
         # Create Access Token
-        access_token = create_access_token(data={"sub": email})
+        access_token = create_access_token(data={"sub": email, "uid": user_id})
         
         # Redirect to Frontend
         frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -101,6 +110,6 @@ async def auth_callback(provider: str, request: Request):
         return RedirectResponse(url=redirect_url)
 
     except Exception as e:
-        print(f"OAuth Error: {e}")
+        logger.warning("OAuth callback failed: %s", e, extra={"provider": provider}, exc_info=True)
         frontend_error_url = os.getenv("FRONTEND_URL", "http://localhost:3000") + "/login?error=oauth_failed"
         return RedirectResponse(url=frontend_error_url)
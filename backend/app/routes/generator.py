@@ -1,48 +1,76 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
-from app.core.db import db
+from fastapi.responses import StreamingResponse
 from app.routes.users import get_current_user
-from app.core.llm import generate_proposal, analyze_job_signals, calculate_reply_strength, refine_proposal
+from app.core.llm import generate_proposal, stream_proposal, analyze_job_signals, calculate_reply_strength, refine_proposal, FRAMEWORK_PROMPTS
+from app.core.scoring import score_replies
+from app.core.signals import detect_signals_batch
+from app.core.prompts import build_proposal_messages
+from app.core import quota
+from app.core.persistence import proposal_writer
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
+from datetime import datetime
+import asyncio
+import json
+import anyio
+import os
 
 router = APIRouter()
 
+# Max concurrent LLM calls for a single batch request, and the largest batch we accept
+BATCH_CONCURRENCY = int(os.getenv("GENERATE_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("GENERATE_BATCH_MAX_ITEMS", "30"))
+
 class GenerateRequest(BaseModel):
     job_description: str
     platform: str
     framework: Optional[str] = "Fast Hook"
     cta_style: Optional[str] = "Confident"
     tone_level: Optional[int] = 50
+    regenerate: Optional[bool] = False # Skip the generation cache and ask the model again
+
+class BatchGenerateRequest(BaseModel):
+    items: List[GenerateRequest]
+
+class VariantsRequest(GenerateRequest):
+    frameworks: Optional[List[str]] = None # Defaults to every framework
 
 class RefineRequest(BaseModel):
     proposal_text: str
     instruction: str
 
-@router.post("/generate")
-def generate_reply(request: GenerateRequest, current_user: dict = Depends(get_current_user)):
-    # Daily Limit Logic
-    from datetime import datetime
-    today_str = datetime.utcnow().strftime("%Y-%m-%d")
-    
-    last_date = current_user.get("last_usage_date")
-    current_usage = current_user.get("daily_usage", 0)
-    
-    if last_date != today_str:
-        # Reset for new day
-        current_usage = 0
-        db.users.update_one(
-            {"_id": current_user["_id"]}, 
-            {"$set": {"daily_usage": 0, "last_usage_date": today_str}}
-        )
-    
-    plan = current_user.get("plan", "free")
-    limit = 1 if plan == "free" else 100 # STRICT 1/day for free users as per Plan
-    
-    if current_usage >= limit:
-         raise HTTPException(status_code=403, detail=f"Daily limit of {limit} reached. Upgrade to Pro for more.")
+def _proposal_record(current_user: dict, request: GenerateRequest, proposal_text: str, analysis: dict) -> dict:
+    # Same prompt the model saw; compaction is cached so this is cheap
+    _, prompt_stats = build_proposal_messages(
+        request.job_description, current_user.get("profile", {}), request.framework, request.cta_style, request.tone_level
+    )
+    return {
+        "user_id": current_user["_id"],
+        "job_description": request.job_description[:200] + "...",
+        "full_job_description": request.job_description,
+        "proposal_text": proposal_text,
+        "platform": request.platform,
+        "framework": request.framework,
+        "score": analysis["score"],
+        "status": "generated",
+        "prompt_tokens_raw": prompt_stats["prompt_tokens_raw"], # before compaction
+        "prompt_tokens": prompt_stats["prompt_tokens"],
+        "created_at": datetime.utcnow()
+    }
+
+async def _record_generation(current_user: dict, request: GenerateRequest, proposal_text: str, analysis: dict) -> str:
+    """Queues the proposal for the history (the credit was already reserved). Returns the new proposal id."""
+    ids = await proposal_writer.add_proposals([_proposal_record(current_user, request, proposal_text, analysis)])
+    return ids[0]
 
+@router.post("/generate")
+async def generate_reply(request: GenerateRequest, current_user: dict = Depends(get_current_user)):
     if not request.job_description:
         raise HTTPException(status_code=400, detail="Job description is required")
+
+    # Daily Limit Logic: take the credit up front, give it back if the model fails
+    quota.check_rate_limit(current_user)
+    reservation = await quota.reserve(current_user)
     
     # 1. Analyze Signals
     signals = analyze_job_signals(request.job_description) # Logic from llm.py
@@ -54,66 +82,244 @@ def generate_reply(request: GenerateRequest, current_user: dict = Depends(get_cu
     # With this new API, we should prefer the structured params if passed, but handle the legacy trick too.
     # For now, we pass request.job_description as is to generate_proposal which uses it in prompts.
     
-    proposal_text = generate_proposal(
+    proposal_text = await generate_proposal(
         job_description=request.job_description,
         user_profile=profile,
         framework=request.framework,
         cta_style=request.cta_style,
-        tone_level=request.tone_level
+        tone_level=request.tone_level,
+        regenerate=request.regenerate
     )
+    if proposal_text.startswith("Error:"):
+        await quota.refund(current_user)
+        raise HTTPException(status_code=502, detail=proposal_text)
     
     # 3. Calculate Strength
     analysis = calculate_reply_strength(proposal_text, request.job_description)
     
-    # Increment usage
-    db.users.update_one({"_id": current_user["_id"]}, {"$inc": {"daily_usage": 1}})
-    
-    # Save to history
-    proposal_record = {
-        "user_id": current_user["_id"],
-        "job_description": request.job_description[:200] + "...",
-        "full_job_description": request.job_description,
-        "proposal_text": proposal_text,
-        "platform": request.platform,
-        "framework": request.framework,
-        "score": analysis["score"],
-        "status": "generated",
-        "created_at": datetime.utcnow()
-    }
-    
-    result = db.proposals.insert_one(proposal_record)
+    proposal_id = await _record_generation(current_user, request, proposal_text, analysis)
     
     return {
         "proposal_text": proposal_text, 
-        "id": str(result.inserted_id),
+        "id": proposal_id,
         "signals": signals,
         "analysis": analysis,
-        "remaining_credits": limit - (current_usage + 1)
+        "remaining_credits": reservation["limit"] - reservation["usage"]
+    }
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/generate/stream")
+async def generate_reply_stream(request: GenerateRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Streaming variant of /generate. Sends `token` events as the model writes, then a final
+    `done` event with the same payload /generate returns (minus the text, which the client already has).
+    """
+    if not request.job_description:
+        raise HTTPException(status_code=400, detail="Job description is required")
+
+    # Quota is reserved before the stream opens so a 403 is still a normal HTTP error
+    quota.check_rate_limit(current_user)
+    reservation = await quota.reserve(current_user)
+
+    signals = analyze_job_signals(request.job_description)
+    profile = current_user.get("profile", {})
+
+    async def event_stream():
+        chunks = []
+        finished = False
+        try:
+            async for delta in stream_proposal(
+                job_description=request.job_description,
+                user_profile=profile,
+                framework=request.framework,
+                cta_style=request.cta_style,
+                tone_level=request.tone_level,
+                regenerate=request.regenerate
+            ):
+                if delta.startswith("Error:"):
+                    # stream_proposal reports failures as a final "Error: ..." chunk
+                    yield _sse("error", {"detail": delta})
+                    return
+                chunks.append(delta)
+                yield _sse("token", {"text": delta})
+
+            proposal_text = "".join(chunks).strip()
+            analysis = calculate_reply_strength(proposal_text, request.job_description)
+            proposal_id = await _record_generation(current_user, request, proposal_text, analysis)
+            finished = True
+
+            yield _sse("done", {
+                "id": proposal_id,
+                "signals": signals,
+                "analysis": analysis,
+                "remaining_credits": reservation["limit"] - reservation["usage"]
+            })
+        finally:
+            # Model error or client hung up before the proposal was saved. On a disconnect
+            # Starlette cancels this generator, and the refund would be cancelled at its first
+            # await without the shield.
+            if not finished:
+                with anyio.CancelScope(shield=True):
+                    await quota.refund(current_user)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate/batch")
+async def generate_batch(request: BatchGenerateRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Generates proposals for several job posts concurrently. Items past the remaining daily
+    credits, empty items and failed generations come back with an `error` and are not charged.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="At least one item is required")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_MAX_ITEMS} items")
+
+    valid = [index for index, item in enumerate(request.items) if item.job_description]
+    if not valid:
+        raise HTTPException(status_code=400, detail="Job description is required")
+
+    # Quota is reserved once for the whole batch: as many credits as are left, up to the batch size
+    quota.check_rate_limit(current_user)
+    reservation = await quota.reserve(current_user, count=len(valid), partial=True)
+
+    profile = current_user.get("profile", {})
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run_item(item: GenerateRequest):
+        async with semaphore:
+            return await generate_proposal(
+                job_description=item.job_description,
+                user_profile=profile,
+                framework=item.framework,
+                cta_style=item.cta_style,
+                tone_level=item.tone_level,
+                regenerate=item.regenerate
+            )
+
+    results = [None] * len(request.items)
+    pending = valid[:reservation["granted"]]
+    for index, item in enumerate(request.items):
+        if not item.job_description:
+            results[index] = {"index": index, "error": "Job description is required"}
+        elif index not in pending:
+            # Not counted in quota_rejections_total: the request itself was (partly) served
+            results[index] = {"index": index, "error": quota.limit_message(reservation["limit"])}
+
+    texts = await asyncio.gather(*(run_item(request.items[i]) for i in pending), return_exceptions=True)
+
+    succeeded = []
+    for index, text in zip(pending, texts):
+        if isinstance(text, Exception):
+            text = f"Error: {str(text)}"
+        if text.startswith("Error:"):
+            results[index] = {"index": index, "error": text}
+        else:
+            succeeded.append((index, text))
+
+    analyses = score_replies((text, request.items[index].job_description) for index, text in succeeded)
+    generated = [(index, text, analysis) for (index, text), analysis in zip(succeeded, analyses)]
+    records = [_proposal_record(current_user, request.items[index], text, analysis) for index, text, analysis in generated]
+
+    failed = len(pending) - len(records)
+    await quota.refund(current_user, failed)
+
+    if records:
+        inserted_ids = await proposal_writer.add_proposals(records)
+        signals = detect_signals_batch(request.items[index].job_description for index, _, _ in generated)
+        for (index, text, analysis), inserted_id, item_signals in zip(generated, inserted_ids, signals):
+            results[index] = {
+                "index": index,
+                "proposal_text": text,
+                "id": str(inserted_id),
+                "signals": item_signals,
+                "analysis": analysis
+            }
+
+    return {
+        "results": results,
+        "generated": len(records),
+        "remaining_credits": reservation["limit"] - (reservation["usage"] - failed)
+    }
+
+@router.post("/generate/variants")
+async def generate_variants(request: VariantsRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Writes one variant per framework in parallel, scores each with calculate_reply_strength and
+    returns them best first. Costs one credit; only the top-ranked variant is saved to history.
+    """
+    frameworks = request.frameworks or list(FRAMEWORK_PROMPTS.keys())
+    unknown = [f for f in frameworks if f not in FRAMEWORK_PROMPTS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown framework(s): {', '.join(unknown)}")
+    # Keep order, drop duplicates
+    frameworks = list(dict.fromkeys(frameworks))
+
+    if not request.job_description:
+        raise HTTPException(status_code=400, detail="Job description is required")
+
+    quota.check_rate_limit(current_user)
+    reservation = await quota.reserve(current_user)
+
+    signals = analyze_job_signals(request.job_description)
+    profile = current_user.get("profile", {})
+
+    texts = await asyncio.gather(*(
+        generate_proposal(
+            job_description=request.job_description,
+            user_profile=profile,
+            framework=framework,
+            cta_style=request.cta_style,
+            tone_level=request.tone_level,
+            regenerate=request.regenerate
+        )
+        for framework in frameworks
+    ))
+
+    written = [(framework, text) for framework, text in zip(frameworks, texts) if not text.startswith("Error:")]
+    analyses = score_replies((text, request.job_description) for _, text in written)
+    variants = [
+        {"framework": framework, "proposal_text": text, "analysis": analysis}
+        for (framework, text), analysis in zip(written, analyses)
+    ]
+    if not variants:
+        await quota.refund(current_user)
+        raise HTTPException(status_code=502, detail=texts[0])
+
+    variants.sort(key=lambda v: v["analysis"]["score"], reverse=True)
+
+    best = variants[0]
+    chosen = request.model_copy(update={"framework": best["framework"]})
+    proposal_id = await _record_generation(current_user, chosen, best["proposal_text"], best["analysis"])
+
+    return {
+        "id": proposal_id,
+        "variants": variants,
+        "signals": signals,
+        "remaining_credits": reservation["limit"] - reservation["usage"]
     }
 
 @router.post("/refine")
-def refine_reply(request: RefineRequest, current_user: dict = Depends(get_current_user)):
+async def refine_reply(request: RefineRequest, current_user: dict = Depends(get_current_user)):
     # Gate Refinement for Pro Users
     plan = current_user.get("plan", "free")
     if plan == "free":
         raise HTTPException(status_code=403, detail="Refinement is a Pro feature. Upgrade to unlock.")
         
-    refined_text = refine_proposal(request.proposal_text, request.instruction)
+    refined_text = await refine_proposal(request.proposal_text, request.instruction)
     return {"refined_text": refined_text}
 
 @router.get("/usage/today")
-def get_usage(current_user: dict = Depends(get_current_user)):
-    from datetime import datetime
-    today_str = datetime.utcnow().strftime("%Y-%m-%d")
-    
-    last_date = current_user.get("last_usage_date")
-    current_usage = current_user.get("daily_usage", 0)
-    
-    if last_date != today_str:
-        current_usage = 0
-        
+async def get_usage(current_user: dict = Depends(get_current_user)):
+    current_usage = quota.current_usage(current_user)
     plan = current_user.get("plan", "free")
-    limit = 1 if plan == "free" else 100
+    limit = quota.plan_limit(plan)
     
     return {
         "usage": current_usage,
@@ -1,48 +1,117 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, HTTPException, Query
 from app.core.db import db
+from app.core import ledger
+from app.core.export import export_response
 from app.routes.users import get_current_user
+from app.models.income import IncomeEntry, MonthlyTotal
 from bson import ObjectId
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
 
 router = APIRouter()
 
 class IncomeCreate(BaseModel):
-    amount: float
+    amount: Decimal = Field(max_digits=12, decimal_places=2)
     client: str
     platform: str
-    date: str # YYYY-MM-DD
-
-@router.get("/income")
-def get_income(current_user: dict = Depends(get_current_user)):
-    cursor = db.income.find({"user_id": current_user["_id"]}).sort("date", -1)
-    incomes = []
-    for i in cursor:
-        i["id"] = str(i["_id"])
-        del i["_id"]
-        if "user_id" in i: del i["user_id"]
-        incomes.append(i)
-    return incomes
+    date: date # YYYY-MM-DD
+
+def _to_record(income: IncomeCreate) -> dict:
+    return {
+        "amount": ledger.to_decimal128(income.amount),
+        "client": income.client,
+        "platform": income.platform,
+        "date": ledger.to_datetime(income.date),
+        "month": ledger.month_of(income.date),
+    }
+
+def _object_id(income_id: str) -> ObjectId:
+    if not ObjectId.is_valid(income_id):
+        raise HTTPException(status_code=404, detail="Income entry not found")
+    return ObjectId(income_id)
+
+def _income_query(current_user: dict, start: Optional[date], end: Optional[date], platform: Optional[str], client: Optional[str]) -> dict:
+    query = {"user_id": current_user["_id"]}
+    if start or end:
+        query["date"] = {}
+        if start:
+            query["date"]["$gte"] = ledger.to_datetime(start)
+        if end:
+            query["date"]["$lt"] = ledger.to_datetime(end + timedelta(days=1))
+    if platform:
+        query["platform"] = platform
+    if client:
+        query["client"] = client
+    return query
+
+@router.get("/income", response_model=List[IncomeEntry])
+async def get_income(
+    current_user: dict = Depends(get_current_user),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    platform: Optional[str] = None,
+    client: Optional[str] = None
+):
+    """Newest first. `start`/`end` are inclusive YYYY-MM-DD bounds."""
+    query = _income_query(current_user, start, end, platform, client)
+    return await db.income.find(query, ledger.API_PROJECTION).sort([("date", -1), ("_id", -1)]).to_list()
+
+@router.get("/income/export")
+async def export_income(
+    current_user: dict = Depends(get_current_user),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    platform: Optional[str] = None,
+    client: Optional[str] = None,
+    gzip: bool = False
+):
+    """Whole ledger (or the filtered part), oldest first, streamed."""
+    query = _income_query(current_user, start, end, platform, client)
+    cursor = db.income.find(query, ledger.API_PROJECTION).sort([("date", 1), ("_id", 1)])
+    return export_response(cursor, "income", format, list(IncomeEntry.model_fields), gzip)
 
 @router.post("/income")
-def add_income(income: IncomeCreate, current_user: dict = Depends(get_current_user)):
-    record = income.dict()
+async def add_income(income: IncomeCreate, current_user: dict = Depends(get_current_user)):
+    record = _to_record(income)
     record["user_id"] = current_user["_id"]
-    result = db.income.insert_one(record)
+    result = await db.income.insert_one(record)
+    await ledger.adjust_month(current_user["_id"], record["month"], record["amount"], 1)
     return {"id": str(result.inserted_id), "status": "added"}
 
-@router.get("/income/summary")
-def get_income_summary(current_user: dict = Depends(get_current_user)):
-    # Aggregation for chart
-    pipeline = [
-        {"$match": {"user_id": current_user["_id"]}},
-        {
-            "$group": {
-                "_id": {"$substr": ["$date", 0, 7]}, # YYYY-MM
-                "total": {"$sum": "$amount"}
-            }
-        },
-        {"$sort": {"_id": 1}}
-    ]
-    summary = list(db.income.aggregate(pipeline))
-    return summary
+@router.put("/income/{income_id}")
+async def update_income(income_id: str, income: IncomeCreate, current_user: dict = Depends(get_current_user)):
+    record = _to_record(income)
+    before = await db.income.find_one_and_update(
+        {"_id": _object_id(income_id), "user_id": current_user["_id"]},
+        {"$set": record},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        raise HTTPException(status_code=404, detail="Income entry not found")
+    # Move the amount out of the old month and into the new one (often the same month).
+    # Entries not yet migrated have no month and aren't in the totals.
+    if "month" in before:
+        await ledger.adjust_month(current_user["_id"], before["month"], ledger.negate(ledger.to_decimal128(before["amount"])), -1)
+    await ledger.adjust_month(current_user["_id"], record["month"], record["amount"], 1)
+    return {"id": income_id, "status": "updated"}
+
+@router.delete("/income/{income_id}")
+async def delete_income(income_id: str, current_user: dict = Depends(get_current_user)):
+    deleted = await db.income.find_one_and_delete({"_id": _object_id(income_id), "user_id": current_user["_id"]})
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Income entry not found")
+    if "month" in deleted:
+        await ledger.adjust_month(current_user["_id"], deleted["month"], ledger.negate(ledger.to_decimal128(deleted["amount"])), -1)
+    return {"id": income_id, "status": "deleted"}
+
+@router.get("/income/summary", response_model=List[MonthlyTotal])
+async def get_income_summary(current_user: dict = Depends(get_current_user)):
+    # Monthly totals for the chart, maintained incrementally (see app/core/ledger.py)
+    return await db.income_monthly.find(
+        {"user_id": current_user["_id"], "count": {"$gt": 0}},
+        {"_id": 0, "month": 1, "total": {"$toDouble": "$total"}}
+    ).sort("month", 1).to_list()
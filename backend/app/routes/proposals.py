@@ -1,75 +1,114 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from app.core.db import db
 from app.routes.users import get_current_user
 from bson import ObjectId
-from typing import List
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+from app.core import rollups
+from app.core.export import export_response
+from app.core.search import highlight, query_pattern
+from app.models.proposal import Analytics, Proposal, ProposalSummary, SearchHit
+from pydantic import BaseModel, Field
+import base64
 
 router = APIRouter()
 
-@router.get("/proposals")
-def get_proposals(current_user: dict = Depends(get_current_user)):
-    cursor = db.proposals.find({"user_id": current_user["_id"]}).sort("created_at", -1)
-    proposals = []
-    for p in cursor:
-        p["id"] = str(p["_id"])
-        if "user_id" in p: del p["user_id"]
-        del p["_id"]
-        proposals.append(p)
-    return proposals
-
-from pydantic import BaseModel
+# Documents come back from Mongo already in the response shape (string id, no user_id).
+# Large text fields are left out of the list view unless view=full.
+SUMMARY_PROJECTION = {"_id": 0, "id": {"$toString": "$_id"}, **{field: 1 for field in ProposalSummary.model_fields if field != "id"}}
+FULL_PROJECTION = {"_id": 0, "id": {"$toString": "$_id"}, **{field: 1 for field in Proposal.model_fields if field != "id"}}
+
+SEARCH_MAX_OFFSET = 500
+# Relevance plus what the highlighter needs; the full texts are dropped before responding
+SEARCH_PROJECTION = {**FULL_PROJECTION, "relevance": {"$meta": "textScore"}}
+
+def encode_cursor(created_at: datetime, proposal_id: ObjectId) -> str:
+    raw = f"{created_at.isoformat()}|{proposal_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, proposal_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(proposal_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/proposals", response_model=List[Proposal], response_model_exclude_unset=True)
+async def get_proposals(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    platform: Optional[str] = None,
+    framework: Optional[str] = None,
+    view: str = Query("summary", pattern="^(summary|full)$")
+):
+    """
+    Newest first, one page at a time. Pages are keyed on (created_at, _id): pass the
+    X-Next-Cursor header from the previous page as `cursor`. The header is absent on the last page.
+    The summary view omits full_job_description and proposal_text.
+    """
+    query = {"user_id": current_user["_id"]}
+    for field, value in (("status", status), ("platform", platform), ("framework", framework)):
+        if value:
+            query[field] = value
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+
+    projection = FULL_PROJECTION if view == "full" else SUMMARY_PROJECTION
+    # Fetch one extra row to know whether there is a next page
+    docs = await db.proposals.find(query, projection).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1).to_list()
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1]["created_at"], docs[-1]["id"])
+    return docs
+
 class StatusUpdate(BaseModel):
-    status: str
+    # Statuses become field names in the analytics rollup, so keep them simple
+    status: str = Field(pattern=r"^[a-z_]{1,32}$")
 
 @router.put("/proposals/{proposal_id}/status")
-def update_proposal_status(proposal_id: str, update: StatusUpdate, current_user: dict = Depends(get_current_user)):
-    result = db.proposals.update_one(
+async def update_proposal_status(proposal_id: str, update: StatusUpdate, current_user: dict = Depends(get_current_user)):
+    if not ObjectId.is_valid(proposal_id):
+        return {"message": "No change or not found"}
+    # Old status is needed to move the count between rollup buckets
+    before = await db.proposals.find_one_and_update(
         {"_id": ObjectId(proposal_id), "user_id": current_user["_id"]},
-        {"$set": {"status": update.status}}
+        {"$set": {"status": update.status}},
+        projection={"status": 1}
     )
-    if result.modified_count == 0:
+    if before is None or before.get("status", "generated") == update.status:
          return {"message": "No change or not found"}
+    await rollups.record_status_change(current_user["_id"], before.get("status"), update.status)
     return {"status": "updated"}
 
-@router.get("/proposals/analytics")
-def get_analytics(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["_id"]
+@router.get("/proposals/analytics", response_model=Analytics)
+async def get_analytics(current_user: dict = Depends(get_current_user)):
+    # Everything comes from the user's rollup document (see app/core/rollups.py)
+    stats = await rollups.get(current_user["_id"])
+    status_counts = stats.get("status", {})
     
     # 1. Total Proposals
-    total_proposals = db.proposals.count_documents({"user_id": user_id})
+    total_proposals = stats.get("total", 0)
     
     # 2. Response Rate
-    replied_count = db.proposals.count_documents({"user_id": user_id, "status": "replied"})
+    replied_count = status_counts.get("replied", 0)
     response_rate = (replied_count / total_proposals * 100) if total_proposals > 0 else 0
     
     # 3. Profile Views (this is per proposal status='viewed'?)
     # Let's assume 'viewed' status means profile view or proposal view.
-    viewed_count = db.proposals.count_documents({"user_id": user_id, "status": "viewed"})
+    viewed_count = status_counts.get("viewed", 0)
     
     # 4. Chart Data (Last 7 Days)
-    from datetime import datetime, timedelta
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    
-    pipeline = [
-        {
-            "$match": {
-                "user_id": user_id,
-                "created_at": {"$gte": seven_days_ago}
-            }
-        },
-        {
-            "$group": {
-                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-                "count": {"$sum": 1}
-            }
-        },
-        {"$sort": {"_id": 1}}
-    ]
-    
-    daily_counts = list(db.proposals.aggregate(pipeline))
-    # Fill in missing days? For simplicity, frontend can handle or we just send what we have.
-    # Let's map it to a simple list.
-    chart_data = [{"name": d["_id"], "sent": d["count"]} for d in daily_counts]
+    since = (datetime.utcnow() - timedelta(days=7)).strftime("%Y-%m-%d")
+    daily = stats.get("daily", {})
+    chart_data = [{"name": day, "sent": daily[day]} for day in sorted(daily) if day >= since and daily[day] > 0]
     
     # 5. Funnel Data
     # Sent (All) -> Viewed -> Replied
@@ -86,3 +125,65 @@ def get_analytics(current_user: dict = Depends(get_current_user)):
         "chart_data": chart_data,
         "funnel_data": funnel_data
     }
+
+@router.get("/proposals/export")
+async def export_proposals(
+    current_user: dict = Depends(get_current_user),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    gzip: bool = False
+):
+    """Full history, oldest first, streamed. `start`/`end` are inclusive YYYY-MM-DD bounds on created_at."""
+    query = {"user_id": current_user["_id"]}
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = datetime.combine(start, datetime.min.time())
+        if end:
+            query["created_at"]["$lt"] = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    cursor = db.proposals.find(query, FULL_PROJECTION).sort([("created_at", 1), ("_id", 1)])
+    return export_response(cursor, "proposals", format, list(Proposal.model_fields), gzip)
+
+@router.get("/proposals/search", response_model=List[SearchHit], response_model_exclude_none=True)
+async def search_proposals(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None
+):
+    """
+    Full-text search over the job post and the proposal, best match first. Supports Mongo $text
+    syntax ("exact phrase", -excluded). Pages like GET /proposals: pass X-Next-Cursor back as `cursor`.
+    """
+    offset = 0
+    if cursor:
+        if not cursor.isdigit() or int(cursor) > SEARCH_MAX_OFFSET:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = int(cursor)
+
+    docs = await db.proposals.find(
+        {"user_id": current_user["_id"], "$text": {"$search": q}},
+        SEARCH_PROJECTION
+    ).sort([("relevance", {"$meta": "textScore"}), ("created_at", -1)]).skip(offset).limit(limit + 1).to_list()
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        if offset + limit <= SEARCH_MAX_OFFSET:
+            response.headers["X-Next-Cursor"] = str(offset + limit)
+
+    pattern = query_pattern(q)
+    for doc in docs:
+        doc["job_highlight"] = highlight(doc.pop("full_job_description", None), pattern)
+        doc["proposal_highlight"] = highlight(doc.pop("proposal_text", None), pattern)
+    return docs
+
+@router.get("/proposals/{proposal_id}", response_model=Proposal)
+async def get_proposal(proposal_id: str, current_user: dict = Depends(get_current_user)):
+    if not ObjectId.is_valid(proposal_id):
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    proposal = await db.proposals.find_one({"_id": ObjectId(proposal_id), "user_id": current_user["_id"]}, FULL_PROJECTION)
+    if proposal is None:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return proposal
@@ -4,9 +4,13 @@ from app.models.user import UserResponse, UserProfile
 from app.core.security import oauth2_scheme
 from jose import jwt, JWTError
 from app.core.security import SECRET_KEY, ALGORITHM
+from app.core import user_cache
 from bson import ObjectId
+import logging
+import time
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -14,35 +18,51 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        # Debug: Print token (be careful in real prod, but fine for debugging)
-        print(f"DEBUG: Verifying token: {token[:10]}...") 
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            print("DEBUG: No 'sub' in payload")
+    # Tokens we've already verified map straight to a user id
+    user_id = user_cache.get_token_user_id(token)
+    if user_id is not None:
+        user = user_cache.get_user(user_id)
+        if user is not None:
+            return user
+        user = await db.users.find_one({"_id": ObjectId(user_id)})
+    else:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                logger.debug("Token has no 'sub' claim")
+                raise credentials_exception
+        except JWTError as e:
+            logger.debug("Token rejected: %s", e)
             raise credentials_exception
-    except JWTError as e:
-        print(f"DEBUG: JWT Error: {str(e)}")
-        raise credentials_exception
-    
-    user = db.users.find_one({"email": email})
+
+        # Tokens issued before `uid` was added only carry the email
+        uid = payload.get("uid")
+        if uid and ObjectId.is_valid(uid):
+            user = await db.users.find_one({"_id": ObjectId(uid)})
+        else:
+            user = await db.users.find_one({"email": email})
+        if user is not None:
+            user_cache.set_token_user_id(token, str(user["_id"]), payload.get("exp", time.time()))
+
     if user is None:
-        print(f"DEBUG: User not found for email: {email}")
+        logger.debug("No user for a valid token")
         raise credentials_exception
+    user_cache.set_user(user)
     return user
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: dict = Depends(get_current_user)):
+async def read_users_me(current_user: dict = Depends(get_current_user)):
     current_user["id"] = str(current_user["_id"])
     return current_user
 
 @router.put("/me/profile", response_model=UserResponse)
-def update_profile(profile: UserProfile, current_user: dict = Depends(get_current_user)):
-    db.users.update_one(
+async def update_profile(profile: UserProfile, current_user: dict = Depends(get_current_user)):
+    await db.users.update_one(
         {"_id": current_user["_id"]},
         {"$set": {"profile": profile.dict()}}
     )
+    user_cache.invalidate_user(current_user["_id"])
     current_user["profile"] = profile.dict()
     current_user["id"] = str(current_user["_id"])
     return current_user
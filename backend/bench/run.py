@@ -0,0 +1,305 @@
+"""
+Load/latency benchmark for the API.
+
+Boots `main:app` under uvicorn against a local MongoDB and the stub LLM server
+(tools/stub_llm.py), seeds users with realistic proposal/income histories, drives
+concurrent load per route and writes p50/p95/p99 latency and throughput as JSON.
+
+    cd backend
+    python -m bench.run                                  # defaults: 1k and 10k proposal histories
+    python -m bench.run --history 1000,100000 --concurrency 32 --requests 400 --llm-latency 0.8
+    python -m bench.run --compare bench/results/<older>.json
+
+Needs a MongoDB at --mongo-url (default mongodb://localhost:27017; plain connections work,
+see MONGO_TLS in app/core/db.py). Everything is written to the --db database (default
+replyboost_bench), which is dropped at the start of each run. Server output is appended to
+bench/results/api.log and bench/results/stub_llm.log.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+import httpx
+from bson import Decimal128
+from jose import jwt
+from pymongo import AsyncMongoClient
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "bench", "results")
+
+STATUSES = ["generated"] * 6 + ["sent"] * 3 + ["viewed", "replied"]
+PLATFORMS = ["Upwork", "Fiverr", "LinkedIn"]
+FRAMEWORKS = ["Fast Hook", "Proof-Driven", "Problem-Solution", "Authority"]
+JOB_WORDS = (
+    "need experienced developer build shopify store migration python django react api integration "
+    "urgent budget fixed ongoing contract senior expert database design deadline dashboard stripe "
+    "automation scraping wordpress figma landing page performance audit seo analytics"
+).split()
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _job_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(JOB_WORDS) for _ in range(words)).capitalize() + "."
+
+# --- Seeding -------------------------------------------------------------------
+
+async def seed_user(db, email: str, proposals: int, incomes: int, rng: random.Random):
+    user_id = (await db.users.insert_one({
+        "email": email, "hashed_password": "", "plan": "pro", "profile": {"skill": "Python", "niche": "SaaS", "experience": "Senior"},
+        "daily_usage": 0, "created_at": datetime.utcnow(),
+    })).inserted_id
+
+    now = datetime.utcnow()
+    batch = []
+    for i in range(proposals):
+        job = _job_text(rng, rng.randint(80, 400))
+        batch.append({
+            "user_id": user_id,
+            "job_description": job[:200] + "...",
+            "full_job_description": job,
+            "proposal_text": _job_text(rng, rng.randint(60, 150)),
+            "platform": rng.choice(PLATFORMS),
+            "framework": rng.choice(FRAMEWORKS),
+            "score": rng.randint(30, 100),
+            "status": rng.choice(STATUSES),
+            "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+        })
+        if len(batch) == 5000:
+            await db.proposals.insert_many(batch)
+            batch = []
+    if batch:
+        await db.proposals.insert_many(batch)
+
+    income_docs = []
+    for _ in range(incomes):
+        day = now - timedelta(days=rng.randint(0, 730))
+        day = datetime(day.year, day.month, day.day)
+        income_docs.append({
+            "user_id": user_id, "client": f"Client {rng.randint(1, 50)}", "platform": rng.choice(PLATFORMS),
+            "amount": Decimal128(Decimal(rng.randint(5000, 500000)) / 100), "date": day, "month": day.strftime("%Y-%m"),
+        })
+    if income_docs:
+        await db.income.insert_many(income_docs)
+        # Same shape ledger.rebuild_monthly produces, so /income/summary reads real totals
+        months = await (await db.income.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": "$month", "total": {"$sum": "$amount"}, "count": {"$sum": 1}}},
+        ])).to_list()
+        await db.income_monthly.insert_many([
+            {"user_id": user_id, "month": m["_id"], "total": m["total"], "count": m["count"]} for m in months
+        ])
+    return user_id
+
+# --- Load ----------------------------------------------------------------------
+
+def _percentile(ordered: list, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+async def drive(client: httpx.AsyncClient, name: str, make_request, requests: int, concurrency: int) -> dict:
+    """Closed-loop load: `concurrency` workers issue `requests` calls in total."""
+    latencies = []
+    statuses = {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            method, url, kwargs = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    # One untimed call first (lazy rollup builds, connection setup)
+    method, url, kwargs = make_request(-1)
+    await client.request(method, url, **kwargs)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    result = {
+        "route": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(_percentile(ordered, 50), 2),
+        "p95_ms": round(_percentile(ordered, 95), 2),
+        "p99_ms": round(_percentile(ordered, 99), 2),
+        "mean_ms": round(statistics.fmean(ordered), 2) if ordered else 0.0,
+        "statuses": statuses,
+    }
+    print(f"  {name:<40} p50 {result['p50_ms']:>8.1f}ms  p95 {result['p95_ms']:>8.1f}ms  "
+          f"p99 {result['p99_ms']:>8.1f}ms  {result['throughput_rps']:>7.1f} rps  {statuses}")
+    return result
+
+# --- Processes -----------------------------------------------------------------
+
+def _start(name: str, args: list, env: dict) -> subprocess.Popen:
+    # Child output goes to bench/results/<name>.log: an unread pipe would block the child once it filled
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, f"{name}.log"), "ab") as log:
+        return subprocess.Popen(args, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+async def _wait_until_up(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+# --- Main ----------------------------------------------------------------------
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    secret = "bench-secret"
+    mongo = AsyncMongoClient(args.mongo_url)
+    await mongo.drop_database(args.db)
+    db = mongo[args.db]
+
+    llm_port, api_port = _free_port(), _free_port()
+    env = dict(os.environ)
+    env.update({
+        "MONGODB_URL": args.mongo_url,
+        "MONGODB_DB": args.db,
+        "SECRET_KEY": secret,
+        "LLM_PROVIDERS": json.dumps([{"name": "stub", "base_url": f"http://127.0.0.1:{llm_port}/v1", "api_key": "stub", "model": "stub"}]),
+        "RATE_LIMIT_PER_SECOND": "0",
+    })
+    processes = [
+        _start("stub_llm", [sys.executable, "tools/stub_llm.py", "--port", str(llm_port), "--latency", str(args.llm_latency), "--jitter", str(args.llm_latency / 5)], env),
+        _start("api", [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port), "--workers", str(args.workers), "--log-level", "warning"], env),
+    ]
+    results = []
+    try:
+        base = f"http://127.0.0.1:{api_port}"
+        await _wait_until_up(f"http://127.0.0.1:{llm_port}/docs")
+        await _wait_until_up(base + "/")
+
+        # Same claims the API issues, signed with the bench secret
+        def token_for(email: str, user_id) -> str:
+            return jwt.encode({"sub": email, "uid": str(user_id), "exp": datetime.utcnow() + timedelta(hours=2)}, secret, algorithm="HS256")
+
+        limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+            for history in args.history:
+                print(f"History of {history} proposals:")
+                email = f"reader{history}@bench.local"
+                user_id = await seed_user(db, email, history, min(history // 10, 2000), rng)
+                headers = {"Authorization": f"Bearer {token_for(email, user_id)}"}
+                get = lambda url: (lambda i: ("GET", url, {"headers": headers}))
+
+                for name, url in [
+                    ("GET /api/proposals", "/api/proposals"),
+                    ("GET /api/proposals?view=full", "/api/proposals?view=full"),
+                    ("GET /api/proposals/analytics", "/api/proposals/analytics"),
+                    ("GET /api/income", "/api/income"),
+                    ("GET /api/income/summary", "/api/income/summary"),
+                    ("GET /api/usage/today", "/api/usage/today"),
+                ]:
+                    result = await drive(client, name, get(url), args.requests, args.concurrency)
+                    results.append({**result, "history": history})
+
+            # Generation: fresh pro users so the 100/day limit isn't what we measure
+            print(f"Generation (stub LLM latency {args.llm_latency}s):")
+            writers = []
+            for n in range(math.ceil(args.generate_requests / 90)):
+                email = f"writer{n}@bench.local"
+                writers.append(token_for(email, await seed_user(db, email, 0, 0, rng)))
+
+            def generate(i):
+                return ("POST", "/api/generate", {
+                    "headers": {"Authorization": f"Bearer {writers[i % len(writers)]}"},
+                    # Unique post per request so the generation cache doesn't answer
+                    "json": {"job_description": f"[{i}] " + _job_text(rng, 250), "platform": "Upwork", "framework": rng.choice(FRAMEWORKS)},
+                })
+            result = await drive(client, "POST /api/generate", generate, args.generate_requests, args.concurrency)
+            results.append({**result, "history": 0})
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        await mongo.drop_database(args.db)
+        await mongo.close()
+
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_sha": _git_sha(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("compare", "out")},
+        "results": results,
+    }
+
+def _git_sha() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def compare(previous: dict, current: dict):
+    old = {(r["route"], r["history"]): r for r in previous["results"]}
+    print(f"\nvs {previous.get('git_sha')} ({previous.get('timestamp')}):")
+    for r in current["results"]:
+        before = old.get((r["route"], r["history"]))
+        if not before:
+            continue
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if before[key]:
+                deltas.append(f"{key} {100 * (r[key] - before[key]) / before[key]:+.1f}%")
+        print(f"  {r['route']:<40} history {r['history']:<7} " + "  ".join(deltas))
+
+def main():
+    parser = argparse.ArgumentParser(description="ReplyBoost API benchmark")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default="replyboost_bench")
+    parser.add_argument("--history", default="1000,10000", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated proposal history sizes to seed (e.g. 1000,10000,100000)")
+    parser.add_argument("--requests", type=int, default=300, help="requests per read route")
+    parser.add_argument("--generate-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stub LLM response latency in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for seeded data and request bodies")
+    parser.add_argument("--out", help="result file (default bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.utcnow().strftime("%Y%m%dT%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
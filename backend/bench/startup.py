@@ -0,0 +1,108 @@
+"""
+Cold-start benchmark with budgets, for CI or before/after comparisons.
+
+Measures, each in a fresh interpreter:
+  - `import main` wall time (median of --runs), and that the lazily loaded SDKs stay unimported
+  - time from spawning uvicorn to the first 200 from GET /
+
+    cd backend
+    python -m bench.startup
+    python -m bench.startup --runs 10 --import-budget 1.5 --ready-budget 3
+
+Exits 1 if a budget is exceeded or a deferred SDK is imported eagerly. No Mongo or LLM
+provider is needed: warmup failures are logged and don't block the health check.
+tests/test_startup.py runs the same checks under pytest.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported by `import main`; they load in the lifespan warmup
+DEFERRED = ("openai", "authlib", "httpx")
+
+IMPORT_BUDGET = 2.0 # seconds, median `import main`
+READY_BUDGET = 4.0 # seconds, median spawn -> first 200 on /
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (DEFERRED,)
+
+def measure_import(env: dict) -> dict:
+    output = subprocess.check_output([sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_ready(env: dict, timeout: float = 30) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"GET / did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+def bench_env() -> dict:
+    env = dict(os.environ)
+    # Point at nothing reachable so the numbers don't depend on a live database
+    env.setdefault("MONGODB_URL", "mongodb://127.0.0.1:1")
+    env.setdefault("MONGO_TIMEOUT_MS", "500")
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET, help="seconds, median `import main`")
+    parser.add_argument("--ready-budget", type=float, default=READY_BUDGET, help="seconds, median spawn -> first 200 on /")
+    args = parser.parse_args()
+
+    env = bench_env()
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    ready = [measure_ready(env) for _ in range(args.runs)]
+    import_median = statistics.median(i["seconds"] for i in imports)
+    ready_median = statistics.median(ready)
+    eager = sorted({m for i in imports for m in i["loaded"]})
+
+    print(f"import main   median {import_median * 1000:7.1f}ms  (budget {args.import_budget * 1000:.0f}ms)")
+    print(f"ready on /    median {ready_median * 1000:7.1f}ms  (budget {args.ready_budget * 1000:.0f}ms)")
+    failed = False
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if import_median > args.import_budget:
+        print("FAIL: import budget exceeded")
+        failed = True
+    if ready_median > args.ready_budget:
+        print("FAIL: ready budget exceeded")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,67 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from contextlib import asynccontextmanager
+import asyncio
+import importlib
+import logging
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# Importing the app package loads .env
+from app.core import log
+log.setup()
 
-app = FastAPI(title="ReplyBoost API")
+logger = logging.getLogger(__name__)
 
-import os
+# The SDKs behind the lazily built clients (LLM providers, OAuth, Mongo)
+HEAVY_MODULES = ("openai", "authlib.integrations.starlette_client", "pymongo", "certifi")
+
+def _build_clients(llm_router, oauth):
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    llm_router.warmup()
+    oauth.warmup()
+
+async def warmup():
+    """
+    Builds the lazy clients after the server is already answering. Requests that arrive first
+    still work; they just build whatever they need themselves.
+    """
+    from app.core import db as mongo, oauth
+    from app.core.indexes import ensure_indexes
+    from app.core.llm import llm_router
+    started = asyncio.get_running_loop().time()
+    try:
+        # Imports and client construction are the slow part and don't need the loop
+        await asyncio.to_thread(_build_clients, llm_router, oauth)
+        await mongo.connect()
+        await ensure_indexes(mongo.db)
+    except Exception:
+        logger.exception("Warmup failed; clients will be built on first use")
+        return
+    logger.info("Warmup done", extra={"seconds": round(asyncio.get_running_loop().time() - started, 3)})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.core import db as mongo
+    from app.core.persistence import proposal_writer
+    warming = asyncio.create_task(warmup())
+    await proposal_writer.start()
+    yield
+    if not warming.done():
+        warming.cancel()
+    # Drain queued history writes while Mongo is still open
+    await proposal_writer.stop()
+    # Close pooled keep-alive connections to the LLM provider and Mongo
+    from app.core.llm import close_client
+    from app.core.security import shutdown_pool
+    await close_client()
+    await mongo.close()
+    shutdown_pool()
+    log.shutdown()
+
+app = FastAPI(title="ReplyBoost API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "http://localhost:3000",
@@ -22,6 +75,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.add_middleware(
@@ -30,6 +84,11 @@ app.add_middleware(
     https_only=False # Set to True in production with HTTPS
 )
 
+from app.core import metrics
+
+# Added last so it is outermost: timings include CORS and session handling
+app.add_middleware(metrics.MetricsMiddleware)
+
 from app.routes import auth, users, generator, proposals, income
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
@@ -42,3 +101,7 @@ app.include_router(income.router, prefix="/api", tags=["income"])
 def read_root():
     return {"status": "ok", "message": "ReplyBoost API is running"}
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # Prometheus text exposition format, per worker process
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,58 @@
+import asyncio
+from bson import ObjectId
+from app.core import quota
+from app.routes import generator
+
+class FakeUsers:
+    def __init__(self, doc):
+        self.doc = doc
+
+    async def find_one_and_update(self, filter, update, projection=None, return_document=None):
+        await asyncio.sleep(0)
+        before = dict(self.doc)
+        self.doc["daily_usage"] = self.doc.get("daily_usage", 0) + 1
+        self.doc["last_usage_date"] = quota.today()
+        return before
+
+    async def update_one(self, filter, update):
+        # A real round trip: suspends, so a cancelled caller never gets here unless shielded
+        await asyncio.sleep(0.01)
+        self.doc["daily_usage"] += update["$inc"]["daily_usage"]
+
+class FakeDb:
+    def __init__(self, user):
+        self.users = FakeUsers(user)
+
+def test_abandoned_stream_refunds_its_credit(monkeypatch):
+    user = {"_id": ObjectId(), "plan": "pro", "daily_usage": 3, "last_usage_date": quota.today()}
+    fake_db = FakeDb(dict(user))
+    monkeypatch.setattr(quota, "db", fake_db)
+
+    async def stream_proposal(**kwargs):
+        yield "Hello"
+        # Still waiting on the model when the client leaves
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(generator, "stream_proposal", stream_proposal)
+
+    async def run():
+        request = generator.GenerateRequest(job_description="Need a Django developer", platform="upwork")
+        response = await generator.generate_reply_stream(request, current_user=user)
+        assert fake_db.users.doc["daily_usage"] == 4
+
+        first_token = asyncio.Event()
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                first_token.set()
+
+        async def receive():
+            await first_token.wait()
+            return {"type": "http.disconnect"}
+
+        # ASGI 2.3, as uvicorn reports it: Starlette cancels the stream when the client disconnects
+        scope = {"type": "http", "asgi": {"spec_version": "2.3"}}
+        await asyncio.wait_for(response(scope, receive, send), timeout=5)
+
+    asyncio.run(run())
+    assert fake_db.users.doc["daily_usage"] == 3
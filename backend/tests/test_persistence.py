@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError
+from app.core import persistence
+
+class FakeProposals:
+    def __init__(self, fail_with=None):
+        self.docs = {}
+        self.fail_with = fail_with
+
+    async def insert_many(self, docs, ordered=True):
+        if self.fail_with is not None:
+            error, self.fail_with = self.fail_with, None
+            raise error
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": persistence.DUPLICATE_KEY, "errmsg": "dup"})
+            elif doc.get("bad"):
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+class FakeStats:
+    def __init__(self, failures=0):
+        self.incs = []
+        self.failures = failures
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("primary stepped down")
+        self.incs.extend(ops)
+        return type("Result", (), {"matched_count": len(ops)})()
+
+class FakeDb:
+    def __init__(self, proposals, stats):
+        self.proposals = proposals
+        self.proposal_stats = stats
+
+def _records(user_id, n, **extra):
+    return [{"user_id": user_id, "created_at": datetime(2026, 1, 10), **extra} for _ in range(n)]
+
+def _run(monkeypatch, db, rebuilt=None):
+    monkeypatch.setattr(persistence, "db", db)
+    async def rebuild(user_id):
+        (rebuilt if rebuilt is not None else []).append(user_id)
+    monkeypatch.setattr(persistence.rollups, "rebuild", rebuild)
+    return persistence.WriteBehindQueue(batch_size=100, interval=1, max_queue=5)
+
+def test_transient_insert_failure_is_retried_and_counted_once(monkeypatch):
+    db = FakeDb(FakeProposals(fail_with=AutoReconnect("down")), FakeStats())
+    queue = _run(monkeypatch, db)
+    user = ObjectId()
+
+    asyncio.run(queue.add_proposals(_records(user, 3)))
+    assert queue.depth == 3 and not db.proposal_stats.incs
+    asyncio.run(queue.flush())
+
+    assert len(db.proposals.docs) == 3
+    assert [op._doc["$inc"]["total"] for op in db.proposal_stats.incs] == [3]
+
+def test_rollup_failure_rebuilds_instead_of_reapplying(monkeypatch):
+    db = FakeDb(FakeProposals(), FakeStats(failures=1))
+    rebuilt = []
+    queue = _run(monkeypatch, db, rebuilt)
+    user = ObjectId()
+
+    asyncio.run(queue.add_proposals(_records(user, 2)))
+    assert len(db.proposals.docs) == 2 and queue.depth == 0
+    assert queue.stats()["stale_rollups"] == 1
+
+    asyncio.run(queue.add_proposals(_records(user, 1)))
+    assert rebuilt == [user]
+    # Only the new record is $inc'd; the failed batch was recounted by the rebuild
+    assert [op._doc["$inc"]["total"] for op in db.proposal_stats.incs] == [1]
+
+def test_permanently_rejected_documents_are_dropped(monkeypatch):
+    db = FakeDb(FakeProposals(), FakeStats())
+    queue = _run(monkeypatch, db)
+    user = ObjectId()
+
+    asyncio.run(queue.add_proposals(_records(user, 2) + _records(user, 1, bad=True)))
+
+    assert len(db.proposals.docs) == 2 and queue.depth == 0
+    assert queue.dropped == 1
+    assert [op._doc["$inc"]["total"] for op in db.proposal_stats.incs] == [2]
+
+def test_queue_is_capped(monkeypatch):
+    db = FakeDb(FakeProposals(), FakeStats())
+    queue = _run(monkeypatch, db)
+    queue._task = object() # pretend the background flusher owns flushing
+
+    ids = asyncio.run(queue.add_proposals(_records(ObjectId(), 8)))
+
+    assert queue.depth == 5 and queue.dropped == 3
+    assert [str(p["_id"]) for p in queue._proposals] == ids[3:]
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from app.core import providers
+
+def _response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=None)
+
+class FakeClient:
+    """Stands in for AsyncOpenAI: `reply` is awaited for each completion."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.started = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, **params):
+        self.started.append(time.monotonic())
+        return await self.reply()
+
+def _ok(text, delay=0.0):
+    async def reply():
+        await asyncio.sleep(delay)
+        return _response(text)
+    return reply
+
+async def _fail():
+    raise ConnectionError("upstream down")
+
+def _router(*replies):
+    router = providers.ProviderRouter()
+    for index, reply in enumerate(replies):
+        provider = providers.Provider(f"p{index}", None, "key", "model", router)
+        provider._client = FakeClient(reply)
+        router.providers.append(provider)
+    return router
+
+PARAMS = {"messages": [{"role": "user", "content": "hi"}]}
+
+@pytest.fixture(autouse=True)
+def _settings(monkeypatch):
+    monkeypatch.setattr(providers, "LLM_HEDGE", False)
+    monkeypatch.setattr(providers, "LLM_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(providers, "LLM_BREAKER_COOLDOWN", 30.0)
+
+def test_fails_over_to_a_healthy_provider():
+    router = _router(_fail, _ok("from backup"))
+    assert asyncio.run(router.complete(PARAMS)) == "from backup"
+    down, healthy = router.providers
+    assert (down.failures, healthy.failures) == (1, 0)
+    assert router.failovers == 1
+    # The failing provider now ranks behind the healthy one
+    assert router.ranked()[0] is healthy
+
+def test_breaker_opens_after_consecutive_failures_then_half_opens():
+    router = _router(_fail)
+    provider = router.providers[0]
+
+    async def run():
+        for _ in range(providers.LLM_BREAKER_FAILURES):
+            assert provider.state == "closed"
+            with pytest.raises(providers.ProviderError):
+                await router.complete(PARAMS)
+
+    asyncio.run(run())
+    assert provider.state == "open"
+    assert not provider.available()
+
+    provider.opened_at -= providers.LLM_BREAKER_COOLDOWN
+    assert provider.state == "half_open"
+    assert provider.available()
+
+def test_half_open_allows_a_single_trial_call():
+    async def run():
+        gate = asyncio.Event()
+
+        async def slow_ok():
+            await gate.wait()
+            return _response("recovered")
+
+        router = _router(slow_ok)
+        provider = router.providers[0]
+        provider.consecutive_failures = providers.LLM_BREAKER_FAILURES
+        provider.opened_at = time.monotonic() - providers.LLM_BREAKER_COOLDOWN
+
+        trial = asyncio.ensure_future(router.complete(PARAMS))
+        while not provider.client.started:
+            await asyncio.sleep(0)
+        assert provider.probing
+        with pytest.raises(providers.ProviderError):
+            await router.complete(PARAMS)
+        assert len(provider.client.started) == 1
+
+        gate.set()
+        assert await trial == "recovered"
+        return provider
+
+    provider = asyncio.run(run())
+    assert provider.state == "closed"
+    assert not provider.probing
+
+def test_hedge_fires_after_the_primary_p95(monkeypatch):
+    monkeypatch.setattr(providers, "LLM_HEDGE", True)
+    monkeypatch.setattr(providers, "LLM_HEDGE_MIN_DELAY", 0.01)
+    router = _router(_ok("primary", delay=2.0), _ok("backup"))
+    primary, backup = router.providers
+    # Primary is normally fast (p95 0.1s) and ranks first
+    primary.latencies.extend([0.1] * 20)
+    primary.latency_ewma = 0.1
+    backup.latency_ewma = 0.5
+
+    started = time.monotonic()
+    assert asyncio.run(router.complete(PARAMS)) == "backup"
+    hedged_after = backup.client.started[0] - started
+    assert 0.1 <= hedged_after < 1.0
+    assert (router.hedges, router.hedge_wins) == (1, 1)
+    # The slower primary was cancelled, not counted as a failure
+    assert primary.failures == 0
@@ -0,0 +1,100 @@
+from app.core.scoring import job_keywords, score_replies, score_reply, tokenize
+
+def baseline_strength(reply: str, job_description: str) -> dict:
+    """llm.calculate_reply_strength as it was before app/core/scoring.py, kept verbatim as the reference."""
+    score = 50
+    breakdown = []
+    word_count = len(reply.split())
+    if 50 <= word_count <= 150:
+        score += 10
+        breakdown.append("Perfect Length")
+    elif word_count < 50:
+        breakdown.append("Too Short")
+    else:
+        score -= 5
+        breakdown.append("Too Long")
+    job_words = set(job_description.lower().split())
+    keywords = [w for w in job_words if len(w) > 5]
+    reply_lower = reply.lower()
+    matches = sum(1 for w in keywords if w in reply_lower)
+    if matches > 2:
+        score += 15
+        breakdown.append("Good Keyword Usage")
+    elif matches > 0:
+        score += 5
+    else:
+        breakdown.append("Missed Keywords")
+    if "?" in reply:
+        score += 15
+        breakdown.append("Clear CTA")
+    else:
+        score -= 10
+        breakdown.append("Missing Question")
+    if "\n" in reply:
+        score += 10
+    return {
+        "score": min(100, max(0, score)),
+        "breakdown": breakdown,
+        "label": "Strong" if score > 80 else "Average" if score > 60 else "Weak"
+    }
+
+JOB = (
+    "We need a senior Django developer to migrate our Shopify storefront to a headless "
+    "setup with Stripe payments and a custom analytics dashboard. Budget is fixed."
+)
+FILLER = " ".join(["I build reliable systems for growing teams every single week"] * 6)
+
+# Replies where token matching and the old substring scan agree: whole, unpunctuated words
+SAME = [
+    # Strong: right length, keywords, question, paragraphs
+    ("I have migrated three Shopify stores to headless Django backends with Stripe payments.\n\n"
+     + FILLER + "\n\nCould we talk tomorrow about your analytics dashboard?"),
+    # Too short, one keyword, no question
+    "Happy to help with the Django work.",
+    # Too long, no keywords, question
+    " ".join(["Hello there, I am a generalist who likes building things"] * 20) + " When can we start?",
+    # Nothing matches, nothing asked
+    "Hi.",
+]
+
+def test_matches_baseline_on_plain_replies():
+    for reply in SAME:
+        assert score_reply(reply, JOB) == baseline_strength(reply, JOB), reply[:40]
+
+def test_output_shape():
+    result = score_reply(SAME[0], JOB)
+    assert set(result) == {"score", "breakdown", "label"}
+    assert result["label"] == "Strong"
+
+def test_batch_equals_single():
+    pairs = [(reply, JOB) for reply in SAME]
+    assert score_replies(pairs) == [score_reply(reply, job) for reply, job in pairs]
+
+# --- Intended drift from the baseline ------------------------------------------------
+
+def test_drift_punctuation_attached_to_job_words():
+    # Baseline keywords keep punctuation ("shopify,", "payments.") so they only match if the reply
+    # has the same punctuation; tokens compare the bare words
+    job = "Shopify, Stripe payments. Django!"
+    reply = "I know shopify and django and stripe payments well?"
+    assert baseline_strength(reply, job)["breakdown"] == ["Too Short", "Clear CTA"] # 1 match: +5
+    assert score_reply(reply, job)["breakdown"] == ["Too Short", "Good Keyword Usage", "Clear CTA"]
+
+def test_drift_substrings_no_longer_count():
+    # Baseline counted "design" inside "designer" and "python" inside "pythonic"
+    job = "design python"
+    reply = "I am a designer who writes pythonic code?"
+    assert baseline_strength(reply, job)["score"] == 70
+    assert score_reply(reply, job)["score"] == 65
+    assert "Missed Keywords" in score_reply(reply, job)["breakdown"]
+
+def test_drift_stopwords_are_not_keywords():
+    # Job-post boilerplate ("looking", "interested", "candidate") no longer earns relevance points
+    job = "looking for interested candidate"
+    reply = "I am interested and looking forward to being your candidate?"
+    assert baseline_strength(reply, job)["breakdown"] == ["Too Short", "Good Keyword Usage", "Clear CTA"]
+    assert score_reply(reply, job)["breakdown"] == ["Too Short", "Missed Keywords", "Clear CTA"]
+    assert job_keywords(job) == frozenset()
+
+def test_tokenize_keeps_tech_names():
+    assert tokenize("C++ and C# with Node.js") == ["c++", "and", "c#", "with", "node", "js"]
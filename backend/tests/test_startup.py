@@ -0,0 +1,17 @@
+import statistics
+from bench import startup
+
+# Cold-start budgets from bench/startup.py, each measured in a fresh interpreter. Three runs
+# keep the suite quick; use `python -m bench.startup --runs 10` for steadier numbers.
+RUNS = 3
+
+def test_import_main_defers_sdks_and_meets_budget():
+    env = startup.bench_env()
+    imports = [startup.measure_import(env) for _ in range(RUNS)]
+    assert sorted({m for i in imports for m in i["loaded"]}) == []
+    assert statistics.median(i["seconds"] for i in imports) < startup.IMPORT_BUDGET
+
+def test_ready_on_root_meets_budget():
+    env = startup.bench_env()
+    ready = [startup.measure_ready(env) for _ in range(RUNS)]
+    assert statistics.median(ready) < startup.READY_BUDGET
@@ -0,0 +1,100 @@
+"""
+Local OpenAI-compatible stub for exercising the provider router (failover, hedging,
+circuit breaking) and benchmarks without network access or API keys.
+
+    python tools/stub_llm.py --port 9001 --latency 0.2 --jitter 0.05 --error-rate 0.0
+
+then point the app at it, e.g.
+
+    LLM_PROVIDERS='[{"name": "stub-a", "base_url": "http://127.0.0.1:9001/v1", "api_key": "x", "model": "stub"},
+                    {"name": "stub-b", "base_url": "http://127.0.0.1:9002/v1", "api_key": "x", "model": "stub"}]'
+
+Behaviour can be changed while it runs with POST /control, e.g. {"error_rate": 1.0} to
+make it fail or {"latency": 5} to make it slow.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+settings = {"latency": 0.2, "jitter": 0.0, "error_rate": 0.0, "token_delay": 0.01}
+
+REPLY = (
+    "Hi! I have shipped this exact kind of project several times, most recently a migration "
+    "that cut page load times in half.\n\nI can start today and share a short plan first. "
+    "Would a quick call tomorrow work for you?"
+)
+
+app = FastAPI(title="Stub LLM")
+
+async def _wait():
+    await asyncio.sleep(max(0.0, settings["latency"] + random.uniform(-settings["jitter"], settings["jitter"])))
+
+def _prompt_tokens(body: dict) -> int:
+    return sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+
+@app.post("/control")
+async def control(request: Request):
+    settings.update(await request.json())
+    return settings
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await _wait()
+    if random.random() < settings["error_rate"]:
+        return JSONResponse({"error": {"message": "stub failure", "type": "server_error"}}, status_code=503)
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "stub")
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": REPLY}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": _prompt_tokens(body),
+                "completion_tokens": len(REPLY.split()),
+                "total_tokens": _prompt_tokens(body) + len(REPLY.split()),
+            },
+        }
+
+    async def events():
+        for word in REPLY.split(" "):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(settings["token_delay"])
+        done = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", type=float, default=settings["latency"], help="seconds before responding")
+    parser.add_argument("--jitter", type=float, default=settings["jitter"], help="+/- seconds of random latency")
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"], help="fraction of 503 responses")
+    parser.add_argument("--token-delay", type=float, default=settings["token_delay"], help="seconds between streamed tokens")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, token_delay=args.token_delay)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
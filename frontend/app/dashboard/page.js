@@ -39,7 +39,7 @@ export default function Dashboard() {
             const [userRes, analyticsRes, proposalsRes] = await Promise.all([
                 api.get('/users/me'),
                 api.get('/proposals/analytics'),
-                api.get('/proposals')
+                api.get('/proposals', { params: { limit: 3 } })
             ]);
 
             setUser(userRes.data);
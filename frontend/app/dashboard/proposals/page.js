@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useEffect, useState } from 'react';
+import React, { useCallback, useEffect, useState } from 'react';
 import { Table, Tag, Typography, Button, message, Input, Select, Tooltip } from 'antd';
 import { CopyOutlined, SearchOutlined, FilterOutlined, EyeOutlined } from '@ant-design/icons';
 import api from '@/lib/api';
@@ -9,33 +9,76 @@ import dayjs from 'dayjs';
 const { Title } = Typography;
 const { Option } = Select;
 
+const PAGE_SIZE = 50;
+
 export default function ProposalsPage() {
     const [proposals, setProposals] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [searchText, setSearchText] = useState('');
+    const [query, setQuery] = useState('');
     const [platformFilter, setPlatformFilter] = useState('All');
 
+    // Debounce typing before asking the server
     useEffect(() => {
-        fetchProposals();
-    }, []);
+        const timer = setTimeout(() => setQuery(searchText.trim()), 300);
+        return () => clearTimeout(timer);
+    }, [searchText]);
+
+    // Summary rows, one server page at a time (the X-Next-Cursor header points at the next one).
+    // Searching goes to /proposals/search so it covers the whole history, not just loaded rows.
+    const fetchPage = useCallback(async (cursor) => {
+        const params = { limit: PAGE_SIZE };
+        if (cursor) params.cursor = cursor;
+        if (query) params.q = query;
+        else if (platformFilter !== 'All') params.platform = platformFilter;
+        const response = await api.get(query ? '/proposals/search' : '/proposals', { params });
+        return { rows: response.data, cursor: response.headers['x-next-cursor'] || null };
+    }, [query, platformFilter]);
 
-    const fetchProposals = async () => {
+    useEffect(() => {
+        let cancelled = false;
+        setLoading(true);
+        fetchPage(null)
+            .then(({ rows, cursor }) => {
+                if (cancelled) return;
+                setProposals(rows);
+                setNextCursor(cursor);
+            })
+            .catch(() => !cancelled && message.error('Failed to load proposals'))
+            .finally(() => !cancelled && setLoading(false));
+        return () => { cancelled = true; };
+    }, [fetchPage]);
+
+    const loadMore = async () => {
+        setLoadingMore(true);
         try {
-            const response = await api.get('/proposals');
-            setProposals(response.data);
+            const { rows, cursor } = await fetchPage(nextCursor);
+            setProposals(prev => [...prev, ...rows]);
+            setNextCursor(cursor);
         } catch (error) {
-            message.error('Failed to load proposals');
+            message.error('Failed to load more proposals');
         } finally {
-            setLoading(false);
+            setLoadingMore(false);
+        }
+    };
+
+    // The list is the summary view; the full text is fetched only when copied
+    const copyProposal = async (record) => {
+        try {
+            const { data } = await api.get(`/proposals/${record.id}`);
+            await navigator.clipboard.writeText(data.proposal_text || '');
+            message.success('Copied!');
+        } catch (error) {
+            message.error('Failed to copy');
         }
     };
 
-    const filteredProposals = proposals.filter(p => {
-        const matchesSearch = p.job_description?.toLowerCase().includes(searchText.toLowerCase()) ||
-            p.proposal_text?.toLowerCase().includes(searchText.toLowerCase());
-        const matchesPlatform = platformFilter === 'All' || p.platform === platformFilter;
-        return matchesSearch && matchesPlatform;
-    });
+    // Search results aren't filtered by platform on the server
+    const filteredProposals = query && platformFilter !== 'All'
+        ? proposals.filter(p => p.platform === platformFilter)
+        : proposals;
 
     const columns = [
         {
@@ -59,7 +102,7 @@ export default function ProposalsPage() {
                             {record.platform}
                         </Tag>
                         <span className="text-xs text-slate-400">
-                            {record.proposal_text ? `${record.proposal_text.split(' ').length} words` : ''}
+                            {record.framework || ''}
                         </span>
                     </div>
                 </div>
@@ -103,10 +146,7 @@ export default function ProposalsPage() {
                             size="small"
                             type="text"
                             className="text-slate-400 hover:text-indigo-600 hover:bg-indigo-50"
-                            onClick={() => {
-                                navigator.clipboard.writeText(record.proposal_text);
-                                message.success('Copied!');
-                            }}
+                            onClick={() => copyProposal(record)}
                         />
                     </Tooltip>
                     <Tooltip title="View Details">
@@ -158,10 +198,15 @@ export default function ProposalsPage() {
                     pagination={{
                         pageSize: 10,
                         showSizeChanger: false,
-                        showTotal: (total, range) => `${range[0]}-${range[1]} of ${total} items`
+                        showTotal: (total, range) => `${range[0]}-${range[1]} of ${total}${nextCursor ? '+' : ''} items`
                     }}
                     rowClassName="hover:bg-slate-50 transition-colors"
                 />
+                {nextCursor && (
+                    <div className="flex justify-center pb-4">
+                        <Button onClick={loadMore} loading={loadingMore}>Load older proposals</Button>
+                    </div>
+                )}
             </div>
         </div>
     );